@@ -0,0 +1,67 @@
+"""
+Cache des images du terrain, décodées une seule fois par processus.
+
+L'image du terrain en 4K (3424x2240) est coûteuse à décoder. On garde en mémoire
+des variantes déjà redimensionnées, une par hauteur demandée (une par qualité de
+rendu et une pour l'aperçu à l'écran). Le nombre de variantes est borné.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+
+BACKGROUND_SIZE = (3424, 2240)  # Taille de l'image originale du terrain (largeur, hauteur)
+MANIM_REFERENCE_HEIGHT = 1080  # Hauteur de référence d'ImageMobject (scale_to_resolution par défaut)
+MAX_BACKGROUND_VARIANTS = 4  # Environ 7 Mo par variante en 1080p
+
+
+@lru_cache(maxsize=MAX_BACKGROUND_VARIANTS)
+def background_array(path, height):
+    """
+    Renvoie l'image du terrain redimensionnée à `height` pixels de haut, en RGBA.
+
+    Le tableau est en lecture seule car il est partagé par tous les appelants.
+
+    Parameters
+    ----------
+    path : str
+        Le chemin de l'image du terrain.
+    height : int
+        La hauteur voulue, en pixels. La largeur respecte les proportions de l'image.
+
+    Returns
+    -------
+    np.ndarray
+        Un tableau (height, width, 4) de uint8.
+    """
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        if height != image.height:
+            width = round(image.width * height / image.height)
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        array = np.asarray(image)
+    array.flags.writeable = False
+    return array
+
+
+def manim_background_height(pixel_height, background_scale):
+    """
+    Hauteur en pixels de l'image du terrain telle qu'elle apparaît dans une vidéo de `pixel_height` pixels de haut.
+
+    Au-delà, les pixels supplémentaires sont perdus lors du rendu.
+    """
+    return min(
+        BACKGROUND_SIZE[1],
+        math.ceil(pixel_height * background_scale * BACKGROUND_SIZE[1] / MANIM_REFERENCE_HEIGHT),
+    )
+
+
+def manim_scale_to_resolution(height):
+    """
+    Valeur de `scale_to_resolution` d'ImageMobject pour une variante de `height` pixels de haut.
+
+    Elle donne à la variante la même taille dans la scène que l'image originale.
+    """
+    return MANIM_REFERENCE_HEIGHT * height / BACKGROUND_SIZE[1]
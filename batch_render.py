@@ -0,0 +1,229 @@
+"""
+Rendu en ligne de commande de fichiers d'animation exportés, sans Streamlit.
+
+Chaque fichier .txt (JSON produit par la section "Exporter l'animation") donne une
+vidéo `<dossier de sortie>/<nom du fichier>.mp4`, et chaque play d'un playbook binaire
+.bbp une vidéo `<dossier de sortie>/<nom du fichier>-<numéro de la play>.mp4`. Les
+rendus sont répartis sur plusieurs processus.
+
+Usage
+-----
+    uv run python batch_render.py playbook/*.txt -o videos/ -j 8
+"""
+import argparse
+import json
+import shutil
+import sys
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+
+from helper import *
+from play_model import upgrade_animation_dict
+from playbook_format import EXTENSION as PLAYBOOK_EXTENSION, iter_plays
+from render_cache import RenderCache, animation_cache_key
+from render_jobs import RenderJobManager, RenderQueueFull
+from render_worker import warm_up
+from renderer import check_node_range, render_to_cache
+from validation import errors as validation_errors, validate_animation
+
+
+REQUIRED_KEYS = (
+    [f"joueur{i+1}_init_pos" for i in range(NUM_JOUEURS)]
+    + [f"defenseur{i+1}_init_pos" for i in range(NUM_DEFENSEURS)]
+    + ["player_number_has_ball", "scene_name", "animation_sequence"]
+)
+
+
+def load_animation_file(path):
+    """
+    Charge un fichier d'animation exporté, vérifie qu'il contient toutes les clés attendues
+    et le met au format normalisé s'il a été exporté par une ancienne version.
+
+    Raises
+    ------
+    ValueError
+        Si le fichier n'est pas un JSON valide, s'il manque des clés ou si une position ou un node est invalide.
+    """
+    try:
+        animation_dict = json.loads(Path(path).read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path} : JSON invalide ({e})") from e
+
+    missing = [key for key in REQUIRED_KEYS if key not in animation_dict]
+    if missing:
+        raise ValueError(f"{path} : clés manquantes {', '.join(missing)}")
+
+    try:
+        return upgrade_animation_dict(animation_dict)
+    except ValueError as e:
+        raise ValueError(f"{path} : {e}") from None
+
+
+def iter_animations(path):
+    """
+    Parcourt les animations d'un fichier : une seule pour un .txt, une par play pour un playbook .bbp.
+
+    Yields
+    ------
+    tuple
+        (nom de la vidéo sans extension, dictionnaire d'animation)
+
+    Raises
+    ------
+    ValueError
+        Si le fichier est invalide.
+    """
+    if path.suffix != PLAYBOOK_EXTENSION:
+        yield path.stem, load_animation_file(path)
+        return
+    with open(path, "rb") as fp:
+        try:
+            for index, play in enumerate(iter_plays(fp)):
+                yield f"{path.stem}-{index + 1:04d}", play.to_dict()
+        except ValueError as e:
+            raise ValueError(f"{path} : {e}") from None
+
+
+def parse_node_range(value):
+    """
+    Lit une plage de nodes "DEBUT:FIN" (numéros à partir de 1, FIN inclus) en plage (début, fin) pour le rendu.
+    """
+    try:
+        first, last = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"plage de nodes invalide : {value!r} (DEBUT:FIN attendu)") from None
+    if not 1 <= first <= last:
+        raise argparse.ArgumentTypeError(f"plage de nodes invalide : {value!r}")
+    return first - 1, last
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rend des fichiers d'animation exportés (.txt) en vidéos, en parallèle."
+    )
+    parser.add_argument("files", nargs="+", type=Path, help=f"Fichiers d'animation (.txt) ou playbooks ({PLAYBOOK_EXTENSION}) à rendre")
+    parser.add_argument(
+        "-o", "--output-dir", type=Path, default=Path("videos"),
+        help="Dossier où écrire les vidéos (par défaut : videos/)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=RENDER_WORKERS,
+        help=f"Nombre de rendus en parallèle (par défaut : {RENDER_WORKERS})",
+    )
+    parser.add_argument(
+        "-q", "--quality", choices=list(RENDER_QUALITIES), default=DEFAULT_RENDER_QUALITY,
+        help=f"Qualité de rendu (par défaut : {DEFAULT_RENDER_QUALITY})",
+    )
+    parser.add_argument(
+        "--nodes", type=parse_node_range, metavar="DEBUT:FIN",
+        help="Ne rendre que les nodes DEBUT à FIN inclus, numérotés à partir de 1 (par exemple 4:9)",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help=(
+            "Ignorer les vidéos complètes en cache et les assembler à nouveau (les segments en cache sont "
+            "réutilisés ; après un changement de style, c'est RENDER_VERSION qui invalide tout le cache)"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Une vidéo par fichier : deux fichiers de même nom écraseraient la même vidéo
+    stems = [path.stem for path in args.files]
+    duplicates = sorted({stem for stem in stems if stems.count(stem) > 1})
+    if duplicates:
+        print(f"Plusieurs fichiers portent le même nom : {', '.join(duplicates)}", file=sys.stderr)
+        return 2
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE)
+    quality = quality_tag(args.quality)
+    # File bornée : un playbook peut contenir des milliers de plays
+    manager = RenderJobManager(
+        max_workers=max(1, args.jobs), max_pending=max(1, args.jobs),
+        initializer=partial(warm_up, [args.quality]),
+    )
+
+    # Les cœurs qui ne servent pas aux rendus en parallèle rendent les scénarios de chaque animation
+    scenario_workers = max(1, SCENARIO_WORKERS // max(1, args.jobs))
+
+    failures = 0
+    jobs = OrderedDict()
+
+    def collect_oldest():
+        nonlocal failures
+        job_id, (path, output_file) = jobs.popitem(last=False)
+        try:
+            video_file = manager.result(job_id)
+        except Exception as e:
+            print(f"[ERREUR] {path} : {e}", file=sys.stderr)
+            failures += 1
+            return
+        try:
+            shutil.copyfile(video_file, output_file)
+        except OSError as e:
+            # Disque plein, droits... : l'échec est celui de ce fichier, pas de celui en cours de soumission
+            print(f"[ERREUR] {path} : copie vers {output_file} impossible ({e})", file=sys.stderr)
+            failures += 1
+            return
+        print(f"[OK] {path} -> {output_file}")
+
+    try:
+        for path in args.files:
+            try:
+                for name, animation_dict in iter_animations(path):
+                    blocking = validation_errors(validate_animation(animation_dict))
+                    if blocking:
+                        for issue in blocking:
+                            print(f"[ERREUR] {path} ({name}) : {issue}", file=sys.stderr)
+                        failures += 1
+                        continue
+                    if args.nodes is not None:
+                        try:
+                            check_node_range(animation_dict, args.nodes)
+                        except ValueError as e:
+                            print(f"[ERREUR] {path} ({name}) : {e}", file=sys.stderr)
+                            failures += 1
+                            continue
+                    output_file = args.output_dir / f"{name}.mp4"
+                    cache_key = animation_cache_key(animation_dict, quality=quality, nodes=args.nodes)
+                    cached_file = None if args.force else render_cache.get(cache_key)
+                    if cached_file is not None:
+                        try:
+                            shutil.copyfile(cached_file, output_file)
+                        except OSError as e:
+                            print(f"[ERREUR] {path} ({name}) : copie vers {output_file} impossible ({e})", file=sys.stderr)
+                            failures += 1
+                            continue
+                        print(f"[CACHE] {path} -> {output_file}")
+                        continue
+
+                    while True:
+                        try:
+                            job_id = manager.submit(
+                                render_to_cache, animation_dict, cache_key, args.quality,
+                                nodes=args.nodes, workers=scenario_workers,
+                            )
+                            break
+                        except RenderQueueFull:
+                            # On attend la fin du plus ancien rendu avant d'en lancer un autre
+                            collect_oldest()
+                    jobs[job_id] = (path, output_file)
+            except (OSError, ValueError) as e:
+                print(f"[ERREUR] {e}", file=sys.stderr)
+                failures += 1
+
+        while jobs:
+            collect_oldest()
+    finally:
+        manager.shutdown()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Benchmarks des chemins critiques de l'application, sur des plays synthétiques.
+
+Les plays sont générées de façon reproductible (graine fixe) en faisant varier une seule
+dimension à la fois autour d'une play de référence : nombre de nodes d'actions, joueurs
+par node, points par déplacement, scénarios (branches après un restore_state) et
+défenseurs. Sont mesurés l'export et l'import JSON et binaire, la validation, la timeline
+de l'aperçu instantané, la description des nodes (`node_to_natural_language`), l'aperçu
+du placement (`render_placement`, dessiné par `show_player_on_court`) et le rendu manim
+complet à chaque qualité, sans cache de segments.
+
+Les résultats sont écrits dans `benchmarks/<commit>.json` pour être comparés d'un commit
+à l'autre avec `--compare`.
+
+Usage
+-----
+    uv run python benchmark.py
+    uv run python benchmark.py --no-render --filter json
+    uv run python benchmark.py --compare benchmarks/1a2b3c4.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+import renderer
+from court_preview import render_placement
+from helper import BACKGROUND_PATH, PREVIEW_BACKGROUND_HEIGHT, RENDER_QUALITIES, clear_mobject_caches, node_to_natural_language
+from play_model import FORMAT_VERSION, NUM_DEFENSEURS, NUM_JOUEURS, upgrade_animation_dict
+from playback import build_timeline
+from playbook_format import iter_plays, play_to_bytes
+from validation import errors as validation_errors, validate_animation
+
+
+BENCHMARK_DIR = "benchmarks"  # Un fichier de résultats par commit, à garder dans le dépôt
+SEED = 0
+REPEAT = 5
+RENDER_REPEAT = 1  # Un rendu complet dure de quelques secondes à plusieurs minutes
+# Play de référence, puis valeurs essayées pour chaque dimension (les autres restent à la référence)
+BASE_PLAY = {"nodes": 20, "players": 3, "points": 4, "branches": 2, "defenders": 5}
+PLAY_VARIATIONS = {
+    "nodes": (10, 100, 1000),
+    "players": (1, 5),
+    "points": (2, 10, 50),
+    "branches": (1, 8),
+    "defenders": (0,),
+}
+RENDER_PLAY = {"nodes": 3, "players": 2, "points": 3, "branches": 1, "defenders": 5}
+
+
+# ========== Plays synthétiques ==========
+
+def _random_point(rng):
+    # Loin des bords pour que les positions restent sur le terrain
+    return [round(rng.uniform(0.05, 0.95), 6), round(rng.uniform(0.05, 0.95), 6)]
+
+
+def _move_node(rng, holder, players, points, shoot=False):
+    """
+    Node d'actions : le porteur de la balle passe (ou tire si `shoot`) s'il fait partie de
+    `players`, les autres joueurs se déplacent en `points` points.
+
+    Returns
+    -------
+    tuple
+        (node, porteur de la balle après le node, ou None après un tir)
+    """
+    moves = []
+    new_holder = holder
+    for player in players:
+        if player == holder and shoot:
+            moves.append([str(player), 1.0, "shoot_ball"])
+            new_holder = None
+        elif player == holder:
+            new_holder = rng.choice([p for p in range(1, NUM_JOUEURS + 1) if p != holder])
+            moves.append([str(player), new_holder, 1.0, "pass_ball"])
+        else:
+            path = [_random_point(rng) for _ in range(points)]
+            moves.append([str(player), *path, round(rng.uniform(1.0, 3.0), 2), "move"])
+    # Groupes de deux actions, décalés de la moitié de leur durée
+    time_arrangement = {str(k): list(range(i, min(i + 2, len(moves)))) for k, i in enumerate(range(0, len(moves), 2))}
+    return {"type": "move", "moves": moves, "time_arrangement": time_arrangement, "time_between": 0.5}, new_holder
+
+
+def synthetic_play(nodes, players, points, branches, defenders, seed=SEED):
+    """
+    Play synthétique valide, toujours la même pour les mêmes paramètres.
+
+    La play commence par un save_state, puis joue `branches` scénarios qui repartent
+    chacun de cet état (restore_state) ; les `nodes` nodes d'actions sont répartis entre
+    les scénarios, et chaque scénario finit par un tir.
+
+    Parameters
+    ----------
+    nodes : int
+        Le nombre de nodes d'actions, au moins `branches`.
+    players : int
+        Le nombre de joueurs qui agissent dans chaque node (1 à 5).
+    points : int
+        Le nombre de points de chaque déplacement.
+    branches : int
+        Le nombre de scénarios.
+    defenders : int
+        Le nombre de défenseurs placés (0 à 5).
+    seed : int
+        La graine du générateur aléatoire.
+
+    Returns
+    -------
+    dict
+        Le dictionnaire d'animation, au format normalisé.
+    """
+    if not 1 <= branches <= nodes:
+        raise ValueError(f"Il faut au moins un node d'actions par scénario ({nodes} nodes, {branches} scénarios)")
+    rng = random.Random(f"{seed}-{nodes}-{players}-{points}-{branches}-{defenders}")
+    first_holder = 1
+    animation_dict = {"format_version": FORMAT_VERSION}
+    for i in range(NUM_JOUEURS):
+        animation_dict[f"joueur{i+1}_init_pos"] = _random_point(rng)
+    for i in range(NUM_DEFENSEURS):
+        animation_dict[f"defenseur{i+1}_init_pos"] = _random_point(rng) if i < defenders else None
+    animation_dict["player_number_has_ball"] = first_holder
+    animation_dict["scene_name"] = f"Benchmark {nodes} nodes"
+
+    sequence = [{"type": "save_state", "name": "depart"}]
+    for branch in range(branches):
+        text = f"Option {branch + 1}"
+        if branch == 0:
+            sequence.append({"type": "write_text", "text": text})
+        else:
+            sequence.append({"type": "restore_state", "name": "depart", "new_text": text})
+        holder = first_holder
+        branch_nodes = nodes // branches + (branch < nodes % branches)
+        for k in range(branch_nodes):
+            shoot = k == branch_nodes - 1
+            others = [p for p in range(1, NUM_JOUEURS + 1) if p != holder]
+            # Le porteur agit toujours au dernier node du scénario, pour tirer
+            if shoot or rng.random() < 0.5:
+                actors = [holder, *rng.sample(others, players - 1)]
+            else:
+                actors = rng.sample(others, min(players, len(others)))
+            node, holder = _move_node(rng, holder, sorted(actors), points, shoot=shoot)
+            sequence.append(node)
+    animation_dict["animation_sequence"] = sequence
+    return animation_dict
+
+
+def play_grid():
+    """
+    Paramètres des plays mesurées : la play de référence, puis une variation par dimension.
+    """
+    grid = [dict(BASE_PLAY)]
+    for key, values in PLAY_VARIATIONS.items():
+        grid.extend({**BASE_PLAY, key: value} for value in values if value != BASE_PLAY[key])
+    return grid
+
+
+# ========== Mesures ==========
+
+def measure(run, repeat, number=None):
+    """
+    Durée d'un appel à `run`, en secondes : minimum et médiane sur `repeat` séries de `number` appels.
+
+    Sans `number`, il est choisi pour qu'une série dure au moins 0,2 s.
+    """
+    timer = timeit.Timer(run)
+    if number is None:
+        number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat, number)]
+    return {"number": number, "repeat": repeat, "min": min(times), "median": statistics.median(times)}
+
+
+def _cold_render(animation_dict, quality):
+    """
+    Rend une animation avec un cache de segments vide, comme la première fois.
+
+    Les pastilles et les textes gardés en mémoire par un rendu précédent (d'une autre
+    qualité) sont aussi oubliés ; seuls les caches disque Tex et Text de manim restent.
+
+    Le rendu est fait dans ce processus (un seul processus de scénarios) : la mesure ne
+    dépend pas du nombre de cœurs.
+    """
+    clear_mobject_caches()
+    default_cache_dir = renderer.SEGMENT_CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        renderer.SEGMENT_CACHE_DIR = str(Path(tmp_dir) / "segments")
+        try:
+            renderer.create_manim_animation(animation_dict, Path(tmp_dir), quality)
+        finally:
+            renderer.SEGMENT_CACHE_DIR = default_cache_dir
+
+
+def iter_benchmarks(render=True):
+    """
+    Parcourt les benchmarks à mesurer.
+
+    Yields
+    ------
+    tuple
+        (nom, paramètres de la play, fonction à chronométrer, nombre de séries)
+    """
+    for params in play_grid():
+        animation_dict = synthetic_play(**params)
+        issues = validation_errors(validate_animation(animation_dict))
+        if issues:
+            raise AssertionError(f"Play synthétique invalide {params} : {issues[0]}")
+        text = json.dumps(animation_dict, indent=4)
+        data = play_to_bytes(animation_dict)
+        sequence = animation_dict["animation_sequence"]
+
+        yield "json_export", params, lambda: json.dumps(animation_dict, indent=4), REPEAT
+        yield "json_import", params, lambda: upgrade_animation_dict(json.loads(text)), REPEAT
+        yield "bbp_export", params, lambda: play_to_bytes(animation_dict), REPEAT
+        yield "bbp_import", params, lambda: [play.to_dict() for play in iter_plays(io.BytesIO(data))], REPEAT
+        yield "validation", params, lambda: validate_animation(animation_dict), REPEAT
+        yield "playback_timeline", params, lambda: build_timeline(animation_dict), REPEAT
+        yield "natural_language", params, lambda: [node_to_natural_language(node) for node in sequence], REPEAT
+        if params["defenders"] != BASE_PLAY["defenders"] or params == BASE_PLAY:
+            # L'aperçu du placement ne dépend que des positions initiales
+            players = [animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)]
+            defenders = [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]
+            yield "court_preview", params, lambda: render_placement(
+                BACKGROUND_PATH, PREVIEW_BACKGROUND_HEIGHT, players, defenders,
+                animation_dict["player_number_has_ball"],
+            ), REPEAT
+
+    if render:
+        animation_dict = synthetic_play(**RENDER_PLAY)
+        for quality in RENDER_QUALITIES:
+            yield f"render_{quality}", RENDER_PLAY, lambda quality=quality: _cold_render(animation_dict, quality), RENDER_REPEAT
+
+
+def _params_label(params):
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def result_key(result):
+    """
+    Identifiant d'un résultat, commun aux fichiers de résultats de deux commits.
+    """
+    return f"{result['benchmark']}[{_params_label(result['params'])}]"
+
+
+# ========== Résultats ==========
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """
+    Commit mesuré et machine de mesure.
+    """
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_results(reference):
+    """
+    Charge un fichier de résultats, désigné par son chemin ou par le commit mesuré.
+
+    Raises
+    ------
+    FileNotFoundError
+        Si aucun fichier de résultats ne correspond.
+    """
+    path = Path(reference)
+    if not path.is_file():
+        path = Path(BENCHMARK_DIR) / f"{reference}.json"
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def format_result(result, reference=None):
+    line = f"{result_key(result):<80} {result['median'] * 1e3:12.3f} ms"
+    if reference is not None:
+        line += f"  {result['median'] / reference['median'] - 1:+8.1%}"
+    return line
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure les chemins critiques de l'application sur des plays synthétiques.")
+    parser.add_argument("--filter", default="", help="Ne mesurer que les benchmarks dont le nom contient ce texte")
+    parser.add_argument("--no-render", action="store_true", help="Ne pas mesurer le rendu manim, de loin le plus long")
+    parser.add_argument(
+        "--compare", metavar="RESULTATS",
+        help="Fichier de résultats (ou commit) de référence : affiche l'écart de chaque mesure",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", type=Path, default=Path(BENCHMARK_DIR),
+        help=f"Dossier des fichiers de résultats (par défaut : {BENCHMARK_DIR}/)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    reference = None
+    if args.compare:
+        try:
+            reference = {result_key(result): result for result in load_results(args.compare)["results"]}
+        except FileNotFoundError:
+            print(f"Aucun résultat pour {args.compare}", file=sys.stderr)
+            return 2
+
+    run = environment()
+    results = []
+    for name, params, function, repeat in iter_benchmarks(render=not args.no_render):
+        if args.filter not in name:
+            continue
+        result = {"benchmark": name, "params": params, **measure(function, repeat, number=1 if name.startswith("render_") else None)}
+        results.append(result)
+        print(format_result(result, reference.get(result_key(result)) if reference else None), flush=True)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = args.output_dir / f"{run['commit']}{'-dirty' if run['dirty'] else ''}.json"
+    output_file.write_text(json.dumps({**run, "results": results}, indent=1), encoding="utf-8")
+    print(f"Résultats écrits dans {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
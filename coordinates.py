@@ -0,0 +1,213 @@
+import numpy as np
+
+
+COURT_IMAGE_SIZE = (3424, 2240)  # Taille de l'image originale du terrain (largeur, hauteur)
+MANIM_FRAME_WIDTH = 12.4  # Largeur du terrain dans l'espace manim (x de -6.2 à 6.2)
+MANIM_FRAME_HEIGHT = 8  # Hauteur du terrain dans l'espace manim (y de -4 à 4)
+UNIT_PRECISION = 6  # Décimales gardées pour les positions normalisées (moins d'un millième de pixel en 4K)
+
+# Une position est soit un point normalisé [u, v] (u = x / width, v = y / height, entre 0 et 1,
+# origine en haut à gauche du terrain), soit un clic brut [x, y, width, height] enregistré par
+# les anciennes versions, qui dépend de la taille de l'image affichée dans le navigateur.
+
+
+# ========== Functions ==========
+
+def convert_coordinates_to_manim(coords):
+    """
+    Convertit les coordonnées d'un point sur l'image originale (origine en haut à gauche)
+    en coordonnées dans l'espace manim, où le centre (0,0) est au milieu, l'axe x va de -6.2 à 6.2
+    et l'axe y de -4 à 4.
+
+    Dans l'image :
+      - (0, 0) est en haut à gauche
+      - (width, height) est en bas à droite (les dimensions de l'image fournie avec les coords)
+
+    Dans manim :
+      - Pour l'axe x, la plage totale est de 12.4 (de -6.2 à 6.2)
+      - Pour l'axe y, la plage totale est de 8 (de -4 à 4), et l'axe y est inversé
+
+    La conversion est la suivante :
+      - manim_x = image_x * (12.4 / width) - 6.2
+      - manim_y = 4 - image_y * (8 / height)
+
+    Parameters
+    ----------
+    coords : tuple
+        Les coordonnées à convertir, sous la forme [x, y, width, height], ou [u, v] pour un point normalisé
+
+    Returns
+    -------
+    tuple
+        Les coordonnées converties dans l'espace manim, sous la forme [x, y, 0]
+    """
+    if len(coords) == 2:
+        (image_x, image_y), width, height = coords, 1, 1
+    else:
+        image_x, image_y, width, height = coords
+
+    scale_x = MANIM_FRAME_WIDTH / width   # Conversion linéaire pour x
+    scale_y = MANIM_FRAME_HEIGHT / height  # Conversion linéaire pour y
+
+    manim_x = image_x * scale_x - MANIM_FRAME_WIDTH / 2
+    manim_y = MANIM_FRAME_HEIGHT / 2 - image_y * scale_y
+
+    return (manim_x, manim_y, 0)
+
+
+def convert_coordinates(x, y, original_width, original_height, target_width=COURT_IMAGE_SIZE[0], target_height=COURT_IMAGE_SIZE[1]):
+    """
+    Convertit les coordonnées d'un clic sur l'image affichée (original_width, original_height)
+    aux coordonnées correspondantes sur l'image originale (target_width, target_height).
+
+    Dans les deux images, l'origine (0, 0) est en haut à gauche.
+
+    Returns
+    -------
+    tuple
+        (converted_x, converted_y) dans l'image originale.
+    """
+    return x * target_width / original_width, y * target_height / original_height
+
+
+def clicks_to_array(clicks):
+    """
+    Rassemble des positions dans un tableau NumPy de clics (x, y, width, height).
+
+    Les points normalisés [u, v] deviennent des clics [u, v, 1, 1].
+
+    Parameters
+    ----------
+    clicks : array-like
+        Les positions, sous la forme [[x, y, width, height], ...] ou [[u, v], ...].
+
+    Returns
+    -------
+    np.ndarray
+        Un tableau (N, 4) de flottants.
+
+    Raises
+    ------
+    ValueError
+        Si les positions n'ont pas toutes la forme (x, y, width, height) ou (u, v).
+    """
+    try:
+        array = np.asarray(clicks, dtype=float)
+    except ValueError:
+        # Mélange de points normalisés et de clics bruts (par exemple une session commencée avant la normalisation)
+        try:
+            array = np.asarray([list(click) + [1, 1] if len(click) == 2 else click for click in clicks], dtype=float)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Positions invalides : {e}") from None
+    except TypeError as e:
+        raise ValueError(f"Positions invalides : {e}") from None
+    if array.size == 0:
+        return array.reshape(0, 4)
+    if array.ndim != 2 or array.shape[1] not in (2, 4):
+        raise ValueError(f"Positions invalides : forme {array.shape}, (N, 4) ou (N, 2) attendue")
+    if array.shape[1] == 2:
+        array = np.hstack([array, np.ones_like(array)])
+    return array
+
+
+def clicks_to_unit(clicks):
+    """
+    Normalise des positions en points [u, v] indépendants de la taille de l'image affichée.
+
+    Returns
+    -------
+    np.ndarray
+        Un tableau (N, 2) de points normalisés, arrondis à UNIT_PRECISION décimales.
+    """
+    clicks = clicks_to_array(clicks)
+    return np.round(clicks[:, :2] / clicks[:, 2:], UNIT_PRECISION)
+
+
+def normalize_click(click):
+    """
+    Normalise un clic (x, y, width, height) en point [u, v], à l'enregistrement du clic.
+    """
+    return clicks_to_unit([click])[0].tolist()
+
+
+def clicks_to_manim(clicks):
+    """
+    Version vectorisée de `convert_coordinates_to_manim` : convertit tous les clics en un seul appel.
+
+    Parameters
+    ----------
+    clicks : array-like
+        Les positions, sous la forme [[x, y, width, height], ...] ou [[u, v], ...].
+
+    Returns
+    -------
+    np.ndarray
+        Un tableau (N, 3) des positions dans l'espace manim, avec z = 0.
+    """
+    clicks = clicks_to_array(clicks)
+    points = np.zeros((len(clicks), 3))
+    points[:, 0] = clicks[:, 0] * (MANIM_FRAME_WIDTH / clicks[:, 2]) - MANIM_FRAME_WIDTH / 2
+    points[:, 1] = MANIM_FRAME_HEIGHT / 2 - clicks[:, 1] * (MANIM_FRAME_HEIGHT / clicks[:, 3])
+    return points
+
+
+def clicks_to_image(clicks, size=COURT_IMAGE_SIZE):
+    """
+    Version vectorisée de `convert_coordinates` : convertit tous les clics en pixels d'une image de taille `size`.
+
+    Parameters
+    ----------
+    clicks : array-like
+        Les positions, sous la forme [[x, y, width, height], ...] ou [[u, v], ...].
+    size : tuple
+        La taille (largeur, hauteur) de l'image cible, par défaut l'image originale en 4K.
+
+    Returns
+    -------
+    np.ndarray
+        Un tableau (N, 2) des positions en pixels, origine en haut à gauche.
+    """
+    clicks = clicks_to_array(clicks)
+    return clicks[:, :2] * (np.asarray(size, dtype=float) / clicks[:, 2:])
+
+
+def optional_clicks_to_manim(clicks):
+    """
+    Comme `clicks_to_manim`, pour une liste où certains clics valent None (joueurs absents).
+
+    Returns
+    -------
+    list
+        La position manim (np.ndarray de 3 valeurs) de chaque clic, ou None.
+    """
+    present = [i for i, click in enumerate(clicks) if click is not None]
+    points = [None] * len(clicks)
+    for i, point in zip(present, clicks_to_manim([clicks[i] for i in present])):
+        points[i] = point
+    return points
+
+
+# ========== Classes ==========
+
+class Position:
+    """
+    Enum with all positions on a basketball court
+    """
+
+    post_45_gauche_loin = [-5, -2, 0]
+    post_45_droit_loin = [5, -2, 0]
+    post_0_droit = [6, 3, 0]
+    post_0_gauche = [-6, 3, 0]
+    post_90_loin = [0, -3.7, 0]
+    post_ailier_gauche = [-2, 2, 0]
+    post_ailier_droit = [2, 2, 0]
+    post_lancer_franc = [0, -1.5, 0]
+    post_lancer_franc_gauche = [-2, -1.5, 0]
+    post_lancer_franc_haut = [0, -3, 0]
+    post_lancer_franc_gauche_haut = [-2, -3, 0]
+    post_lancer_franc_droit_haut = [2, -3, 0]
+    touche_cote_gauche = [-6.5, -2, 0]
+    touche_cote_droit = [6.5, -2, 0]
+    touche_fond_gauche = [-4, 3.7, 0]
+    touche_fond_droit = [4, 3.7, 0]
+    net_position = [0, 2.3, 0]
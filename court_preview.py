@@ -0,0 +1,174 @@
+"""
+Aperçus du terrain dessinés directement sur l'image réduite du terrain, sans matplotlib.
+
+Les marqueurs (joueurs, défenseurs, balle, points d'un déplacement) sont dessinés
+avec Pillow sur une copie de la variante en cache de l'image du terrain, puis
+l'image est encodée en JPEG. Un aperçu prend quelques millisecondes.
+"""
+import io
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from assets import background_array
+from coordinates import clicks_to_image
+from render_cache import content_hash
+
+
+PLAYER_COLOR = (0, 128, 0)  # Vert, comme dans l'ancien aperçu matplotlib
+DEFENDER_COLOR = (255, 0, 0)
+PATH_COLOR = (0, 0, 255)
+BALL_COLOR = (255, 165, 0)
+LABEL_COLOR = (255, 255, 255)
+JPEG_QUALITY = 85
+
+
+@lru_cache(maxsize=4)
+def _font(size):
+    return ImageFont.load_default(size=size)
+
+
+class PreviewCache:
+    """
+    Cache LRU d'aperçus encodés, indexé par une empreinte des paramètres de l'aperçu.
+
+    La plupart des réexécutions du script ne changent ni les positions ni le joueur
+    avec la balle : l'aperçu déjà encodé est alors réutilisé tel quel.
+
+    Usage
+    -----
+    >>> cache = PreviewCache(max_entries=16)
+    >>> image = cache.get_or_render(("placement", positions, ball), lambda: render_placement(...))
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get_or_render(self, inputs, render):
+        """
+        Renvoie l'aperçu correspondant à `inputs`, en appelant `render()` s'il n'est pas en cache.
+
+        `inputs` doit contenir tout ce dont dépend l'aperçu et être sérialisable en JSON.
+        """
+        key = content_hash(inputs)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        image = render()
+        self._entries[key] = image
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return image
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CourtCanvas:
+    """
+    Image du terrain sur laquelle on dessine des marqueurs.
+
+    Les positions sont des points normalisés [u, v] entre 0 et 1 (origine en haut à gauche
+    du terrain), indépendants de la taille de l'image affichée lors du clic (voir
+    `coordinates.normalize_click`). Les clics bruts (x, y, width, height) d'anciens fichiers
+    sont encore acceptés, mais ne doivent plus être enregistrés.
+    """
+
+    def __init__(self, background_path, height):
+        self.image = Image.fromarray(background_array(background_path, height)).convert("RGB")
+        self.draw = ImageDraw.Draw(self.image)
+        self.radius = max(4, height // 50)
+        self.font = _font(int(self.radius * 1.3))
+
+    def to_pixels(self, positions):
+        """
+        Convertit des points normalisés [u, v] en pixels de l'aperçu, en un seul appel.
+
+        Returns
+        -------
+        list
+            Les points (x, y) de l'aperçu.
+        """
+        return [tuple(point) for point in clicks_to_image(positions, self.image.size).tolist()]
+
+    def marker(self, point, color, label, ball=False):
+        """
+        Dessine un disque numéroté au point (x, y) de l'aperçu, entouré d'une couronne orange si le joueur a la balle.
+        """
+        x, y = point
+        r = self.radius
+        if ball:
+            ring = r * 1.6
+            self.draw.ellipse((x - ring, y - ring, x + ring, y + ring), outline=BALL_COLOR, width=max(2, r // 3))
+        self.draw.ellipse((x - r, y - r, x + r, y + r), fill=color, outline=LABEL_COLOR, width=1)
+        self.draw.text((x, y), str(label), fill=LABEL_COLOR, font=self.font, anchor="mm")
+
+    def polyline(self, points, color):
+        if len(points) > 1:
+            self.draw.line(points, fill=color, width=max(1, self.radius // 4))
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        self.image.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+        return buffer.getvalue()
+
+
+def render_placement(background_path, height, player_positions, defender_positions, player_number_has_ball, show_defenders=True):
+    """
+    Aperçu du placement des attaquants (en vert) et des défenseurs (en rouge).
+
+    Parameters
+    ----------
+    background_path : str
+        Le chemin de l'image du terrain.
+    height : int
+        La hauteur de l'aperçu, en pixels.
+    player_positions : list
+        Les positions des attaquants, None pour un attaquant pas encore placé.
+    defender_positions : list
+        Les positions des défenseurs, None pour un défenseur absent.
+    player_number_has_ball : int
+        Le numéro de l'attaquant qui a la balle.
+    show_defenders : bool
+        Afficher ou non les défenseurs.
+
+    Returns
+    -------
+    bytes
+        L'aperçu encodé en JPEG.
+    """
+    canvas = CourtCanvas(background_path, height)
+    if show_defenders:
+        for idx, point in _placed_points(canvas, defender_positions):
+            canvas.marker(point, DEFENDER_COLOR, idx + 1)
+    for idx, point in _placed_points(canvas, player_positions):
+        canvas.marker(point, PLAYER_COLOR, idx + 1, ball=idx + 1 == player_number_has_ball)
+    return canvas.to_bytes()
+
+
+def _placed_points(canvas, positions):
+    """
+    Renvoie les couples (indice, point de l'aperçu) des positions qui ne valent pas None.
+    """
+    placed = [idx for idx, pos in enumerate(positions) if pos is not None]
+    return zip(placed, canvas.to_pixels([positions[idx] for idx in placed]))
+
+
+def render_path(background_path, height, positions):
+    """
+    Aperçu des points successifs d'un déplacement, numérotés à partir de 1.
+
+    Returns
+    -------
+    bytes
+        L'aperçu encodé en JPEG.
+    """
+    canvas = CourtCanvas(background_path, height)
+    points = canvas.to_pixels(positions)
+    canvas.polyline(points, PATH_COLOR)
+    for idx, point in enumerate(points):
+        canvas.marker(point, PATH_COLOR, idx + 1)
+    return canvas.to_bytes()
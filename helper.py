@@ -1,5 +1,8 @@
 # main_script.py
+import os
+from collections import OrderedDict
 from manim import *
+from coordinates import Position, convert_coordinates, convert_coordinates_to_manim
 
 
 # Configuration
@@ -8,108 +11,40 @@ NUM_DEFENSEURS = 5
 SPACE_BETWEEN_SECTIONS = 5
 BACKGROUND_PATH = "images/basketball_court_4K.png"
 BACKGROUND_SCALE = 0.485
+PREVIEW_BACKGROUND_HEIGHT = 720  # Hauteur de l'image du terrain dans les aperçus, en pixels
+PREVIEW_CACHE_SIZE = 16  # Nombre d'aperçus encodés gardés en mémoire par session (environ 60 Ko chacun)
+PLAYBACK_COMPONENT_HEIGHT = 600  # Hauteur du lecteur de l'aperçu instantané, en pixels
 DEBUG = False
+RENDER_CACHE_DIR = "media/cache/renders"
+RENDER_CACHE_MAX_SIZE = 2 * 1024**3  # 2 Go de vidéos en cache au maximum
+SEGMENT_CACHE_DIR = "media/cache/segments"  # Un fichier par node rendu, réutilisé d'un rendu à l'autre
+SEGMENT_CACHE_MAX_SIZE = 2 * 1024**3
+RENDER_JOBS_DIR = "media/jobs"  # Un sous-dossier isolé par rendu
+RENDER_JOBS_MAX_AGE = 60 * 60  # Les dossiers de rendu abandonnés sont supprimés après 1 heure
+RENDER_METRICS_DIR = "media/metrics"  # Profil JSON de chaque rendu et métriques Prometheus du dernier rendu
+RENDER_METRICS_MAX_FILES = 500
+TEX_DIR = "media/Tex"  # Cache Tex de manim, partagé entre tous les rendus
+TEXT_DIR = "media/texts"  # Cache Text de manim, partagé entre tous les rendus
+TEXT_MOBJECT_CACHE_SIZE = 256  # Textes (titres, textes de situation) gardés en mémoire par processus de rendu
+RENDER_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # Un cœur reste libre pour Streamlit
+RENDER_QUEUE_SIZE = 8  # Nombre maximal de rendus en attente en plus de ceux en cours
+RENDER_POLL_INTERVAL = 1  # Intervalle de suivi d'un rendu en cours, en secondes
+SCENARIO_WORKERS = RENDER_WORKERS  # Cœurs partagés entre les rendus en cours pour rendre en parallèle leurs scénarios (branches après un restore_state)
+# Qualités de rendu : "draft" pour itérer rapidement, "final" pour la vidéo de présentation
+RENDER_QUALITIES = {
+    "draft": {"label": "Brouillon (480p15)", "pixel_width": 854, "pixel_height": 480, "frame_rate": 15},
+    "final": {"label": "Finale (1080p60)", "pixel_width": 1920, "pixel_height": 1080, "frame_rate": 60},
+}
+DEFAULT_RENDER_QUALITY = "final"
 
 # ========== Functions ==========
 
-def convert_coordinates(x, y):
+def quality_tag(quality):
     """
-    Convertit les coordonnées d'un clic sur l'image affichée (703x460)
-    aux coordonnées correspondantes sur l'image originale (3424x2240).
-
-    Dans l'image affichée, l'origine (0, 0) est en haut à gauche.
-
-    Ici, on suppose que l'image originale possède son origine en bas à gauche.
-
-    Parameters
-    ----------
-    x : float
-        Coordonnée x sur l'image affichée.
-    y : float
-        Coordonnée y sur l'image affichée (origine en haut).
-
-    Returns
-    -------
-    tuple
-        (converted_x, converted_y) dans l'image originale.
-    """
-    scale_x = 3424 / 703
-    scale_y = 2240 / 460
-    
-    converted_x = x * scale_x
-    converted_y = y * scale_y 
-
-    return converted_x, converted_y
-
-
-def convert_coordinates(x, y, original_width, original_height, target_width=3424, target_height=2240):
-    """
-    Convertit les coordonnées d'un clic sur l'image affichée (original_width, original_height)
-    aux coordonnées correspondantes sur l'image originale (target_width, target_height).
-
-    Dans l'image affichée, l'origine (0, 0) est en haut à gauche.
-
-    Ici, on suppose que l'image originale possède son origine en bas à gauche.
-
-    Parameters
-    ----------
-    x : float
-        Coordonnée x sur l'image affichée.
-    y : float
-        Coordonnée y sur l'image affichée (origine en haut).
-
-    Returns
-    -------
-    tuple
-        (converted_x, converted_y) dans l'image originale.
-    """
-    
-    scale_x = target_width / original_width
-    scale_y = target_height / original_height
-    
-    converted_x = x * scale_x
-    converted_y = y * scale_y 
-
-    return converted_x, converted_y
-
-
-def convert_coordinates_to_manim(coords):
-    """
-    Convertit les coordonnées d'un point sur l'image originale (origine en haut à gauche)
-    en coordonnées dans l'espace manim, où le centre (0,0) est au milieu, l'axe x va de -6.2 à 6.2
-    et l'axe y de -4 à 4.
-
-    Dans l'image :
-      - (0, 0) est en haut à gauche
-      - (width, height) est en bas à droite (les dimensions de l'image fournie avec les coords)
-
-    Dans manim :
-      - Pour l'axe x, la plage totale est de 12.4 (de -6.2 à 6.2)
-      - Pour l'axe y, la plage totale est de 8 (de -4 à 4), et l'axe y est inversé
-
-    La conversion est la suivante :
-      - manim_x = image_x * (12.4 / width) - 6.2
-      - manim_y = 4 - image_y * (8 / height)
-
-    Parameters
-    ----------
-    coords : tuple
-        Les coordonnées à convertir, sous la forme [x, y, width, height]
-
-    Returns
-    -------
-    tuple
-        Les coordonnées converties dans l'espace manim, sous la forme [x, y, 0]
+    Renvoie la résolution et la fréquence d'une qualité de rendu, par exemple "480p15" pour "draft".
     """
-    image_x, image_y, width, height = coords
-
-    scale_x = 12.4 / width   # Conversion linéaire pour x
-    scale_y = 8 / height      # Conversion linéaire pour y
-
-    manim_x = image_x * scale_x - 6.2
-    manim_y = 4 - image_y * scale_y
-
-    return (manim_x, manim_y, 0)
+    settings = RENDER_QUALITIES[quality]
+    return f"{settings['pixel_height']}p{settings['frame_rate']}"
 
 
 def node_to_natural_language(node):
@@ -171,32 +106,81 @@ def convert_groups_to_str(groups):
     )
 
 
-# ========== Classes ==========
+# Pastilles numérotées préconstruites, une par (numéro, défenseur), pour tout le processus
+_player_labels = {}
+
+
+def player_label(number, defenseur=False):
+    """
+    Renvoie une copie de la pastille numérotée d'un joueur, centrée à l'origine.
+
+    Le numéro est un Tex : le construire demande une compilation LaTeX et dvisvgm, ou au
+    mieux la lecture du SVG dans le cache Tex. Chaque pastille n'est donc construite qu'une
+    fois par processus, puis copiée pour chaque scène.
+
+    Parameters
+    ----------
+    number : int
+        Le numéro du joueur, de 1 à 5.
+    defenseur : bool
+        Pastille de défenseur (rouge) plutôt que d'attaquant (verte).
+    """
+    key = (number, defenseur)
+    label = _player_labels.get(key)
+    if label is None:
+        color = GREEN if not defenseur else ManimColor("#FF0000")
+        # Le cache Tex partagé, même si la pastille est construite hors d'un rendu
+        with tempconfig({"tex_dir": TEX_DIR}):
+            label = LabeledDot(Tex(number, color=WHITE)).scale(0.7).set_color(color)
+        label.set_stroke(color=WHITE, width=2, opacity=1)
+        _player_labels[key] = label
+    return label.copy()
 
-class Position:
+
+def warm_player_labels():
     """
-    Enum with all positions on a basketball court
+    Construit à l'avance les pastilles des numéros 1 à 5, attaquants et défenseurs (voir `player_label`).
     """
+    for number in range(1, max(NUM_JOUEURS, NUM_DEFENSEURS) + 1):
+        for defenseur in (False, True):
+            player_label(number, defenseur)
+
 
-    post_45_gauche_loin = [-5, -2, 0]
-    post_45_droit_loin = [5, -2, 0]
-    post_0_droit = [6, 3, 0]
-    post_0_gauche = [-6, 3, 0]
-    post_90_loin = [0, -3.7, 0]
-    post_ailier_gauche = [-2, 2, 0]
-    post_ailier_droit = [2, 2, 0]
-    post_lancer_franc = [0, -1.5, 0]
-    post_lancer_franc_gauche = [-2, -1.5, 0]
-    post_lancer_franc_haut = [0, -3, 0]
-    post_lancer_franc_gauche_haut = [-2, -3, 0]
-    post_lancer_franc_droit_haut = [2, -3, 0]
-    touche_cote_gauche = [-6.5, -2, 0]
-    touche_cote_droit = [6.5, -2, 0]
-    touche_fond_gauche = [-4, 3.7, 0]
-    touche_fond_droit = [4, 3.7, 0]
-    net_position = [0, 2.3, 0]
+# Textes déjà construits, du moins au plus récemment utilisé, pour tout le processus
+_text_mobjects = OrderedDict()
 
 
+def text_mobject(text):
+    """
+    Renvoie une copie d'un Text de `text`, non transformé, centré à l'origine.
+
+    Un Text passe par Pango puis par un SVG (au mieux lu dans le cache Text). Les mêmes
+    titres et textes de situation reviennent d'un scénario et d'un rendu à l'autre : les
+    TEXT_MOBJECT_CACHE_SIZE derniers textes utilisés sont gardés pour tout le processus.
+    """
+    mobject = _text_mobjects.get(text)
+    if mobject is None:
+        # Le cache Text partagé, même si le texte est construit hors d'un rendu
+        with tempconfig({"text_dir": TEXT_DIR}):
+            mobject = Text(text)
+        _text_mobjects[text] = mobject
+        while len(_text_mobjects) > TEXT_MOBJECT_CACHE_SIZE:
+            _text_mobjects.popitem(last=False)
+    else:
+        _text_mobjects.move_to_end(text)
+    return mobject.copy()
+
+
+def clear_mobject_caches():
+    """
+    Vide les caches de pastilles et de textes du processus (voir `player_label` et `text_mobject`).
+    """
+    _player_labels.clear()
+    _text_mobjects.clear()
+
+
+# ========== Classes ==========
+
 class Player:
     def __init__(self, number, position, has_ball, defenseur=False):
         self.number = number  # i.e. 1, 2, 3, 4, 5
@@ -205,16 +189,8 @@ class Player:
         )
         self.has_ball = has_ball  # boolean
         self.defenseur = defenseur  # True if it's a defenseur
-        color = GREEN if not defenseur else ManimColor("#FF0000")
-        # Manim object representing the player (BLACK for attacker, RED for defenseur)
-        self.manim_object = LabeledDot(Tex(number, color=WHITE)).move_to(
-            position
-        ).scale(0.7).set_color(color)
-        self.manim_object.set_stroke(
-            color=WHITE,
-            width=2,
-            opacity=1,
-        )
+        # Manim object representing the player (GREEN for attacker, RED for defenseur)
+        self.manim_object = player_label(number, defenseur).move_to(position)
 
     def move(self, ball, *positions_list, run_time=3):
         """
@@ -3,11 +3,26 @@ from manim import *
 from helper import *
 from pathlib import Path
 import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
+import io
 import json
 import time
 import traceback
-
+from coordinates import normalize_click
+from court_preview import PreviewCache, render_placement, render_path
+from play_model import FORMAT_VERSION, upgrade_animation_dict
+from playbook_archive import EXTENSION as ARCHIVE_EXTENSION, PlaybookArchive
+from playbook_format import EXTENSION as PLAYBOOK_EXTENSION, iter_plays, play_to_bytes
+from playback import background_data_url, build_timeline, playback_html
+from profiling import load_metrics
+from render_cache import RenderCache, animation_cache_key
+from render_jobs import RenderJobManager, RenderQueueFull
+from render_output import new_job_dir, ready_segments, remove_job_dir
+from render_worker import warm_up
+from renderer import concat_videos, render_to_cache
+from scene_state import TimelineIndex
+from validation import ERROR as VALIDATION_ERROR, errors as validation_errors, validate_animation
+
+import streamlit.components.v1 as components
 from streamlit_extras.floating_button import floating_button
 from streamlit_extras.row import row
 from streamlit_image_coordinates import streamlit_image_coordinates
@@ -17,280 +32,23 @@ from streamlit_extras.add_vertical_space import add_vertical_space
 st.set_page_config(layout="wide", page_title="Système de Basketball")
 
 
-def create_manim_animation(animation_sequence):
+@st.cache_resource
+def get_render_cache():
     """
-    Fonction qui crée une animation manim à partir d'une séquence d'animation
-    
-    Parameters
-    ----------
-    animation_sequence : list
-        La séquence d'animation à exécuter. Chaque élément de la liste doit être un dictionnaire
-    
-    Usage
-    -----
-    >>> animation_file = create_manim_animation(st.session_state.animation_sequence)
-    >>> _, col_preview, _ = st.columns([1, 8, 1])
-    >>> col_preview.video(str(animation_file), autoplay=True)
+    Cache de rendu partagé entre toutes les sessions du serveur.
     """
-    class Systeme_basketball(MovingCameraScene):
-        def __init__(
-            self,
-            joueur1_init_pos=convert_coordinates_to_manim(st.session_state["player_positions"][0]),
-            joueur2_init_pos=convert_coordinates_to_manim(st.session_state["player_positions"][1]),
-            joueur3_init_pos=convert_coordinates_to_manim(st.session_state["player_positions"][2]),
-            joueur4_init_pos=convert_coordinates_to_manim(st.session_state["player_positions"][3]),
-            joueur5_init_pos=convert_coordinates_to_manim(st.session_state["player_positions"][4]),
-            defenseur1_init_pos=(
-                convert_coordinates_to_manim(st.session_state["defenseur_positions"][0])
-                if st.session_state["defenseur_positions"][0] is not None
-                else None
-            ),
-            defenseur2_init_pos=(
-                convert_coordinates_to_manim(st.session_state["defenseur_positions"][1])
-                if st.session_state["defenseur_positions"][1] is not None
-                else None
-            ),
-            defenseur3_init_pos=(
-                convert_coordinates_to_manim(st.session_state["defenseur_positions"][2])
-                if st.session_state["defenseur_positions"][2] is not None
-                else None
-            ),
-            defenseur4_init_pos=(
-                convert_coordinates_to_manim(st.session_state["defenseur_positions"][3])
-                if st.session_state["defenseur_positions"][3] is not None
-                else None
-            ),
-            defenseur5_init_pos=(
-                convert_coordinates_to_manim(st.session_state["defenseur_positions"][4])
-                if st.session_state["defenseur_positions"][4] is not None
-                else None
-            ),
-            player_number_has_ball=player_number_has_ball,
-            **kwargs,
-        ):
-            super().__init__(**kwargs)
-            self.joueur1 = Player(
-                1, joueur1_init_pos, True if player_number_has_ball == 1 else False
-            )
-            self.joueur2 = Player(
-                2, joueur2_init_pos, True if player_number_has_ball == 2 else False
-            )
-            self.joueur3 = Player(
-                3, joueur3_init_pos, True if player_number_has_ball == 3 else False
-            )
-            self.joueur4 = Player(
-                4, joueur4_init_pos, True if player_number_has_ball == 4 else False
-            )
-            self.joueur5 = Player(
-                5, joueur5_init_pos, True if player_number_has_ball == 5 else False
-            )
+    return RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE)
 
-            self.defenseur1 = (
-                Player(1, defenseur1_init_pos, False, defenseur=True)
-                if defenseur1_init_pos is not None
-                else None
-            )
-            self.defenseur2 = (
-                Player(2, defenseur2_init_pos, False, defenseur=True)
-                if defenseur2_init_pos is not None
-                else None
-            )
-            self.defenseur3 = (
-                Player(3, defenseur3_init_pos, False, defenseur=True)
-                if defenseur3_init_pos is not None
-                else None
-            )
-            self.defenseur4 = (
-                Player(4, defenseur4_init_pos, False, defenseur=True)
-                if defenseur4_init_pos is not None
-                else None
-            )
-            self.defenseur5 = (
-                Player(5, defenseur5_init_pos, False, defenseur=True)
-                if defenseur5_init_pos is not None
-                else None
-            )
 
-            player_with_ball = (
-                self.joueur1
-                if player_number_has_ball == 1
-                else (
-                    self.joueur2
-                    if player_number_has_ball == 2
-                    else (
-                        self.joueur3
-                        if player_number_has_ball == 3
-                        else (
-                            self.joueur4
-                            if player_number_has_ball == 4
-                            else self.joueur5
-                        )
-                    )
-                )
-            )
-            # La balle est une courronne de couleur orange
-            self.ball = Circle(
-                radius=0.2,
-                color=ORANGE,
-            ).move_to(player_with_ball.position)
-
-            # Pour sauvegarder l'état des joueurs et de la balle à différents moments
-            self.animation_states = {}
-
-            self.players = [
-                self.joueur1,
-                self.joueur2,
-                self.joueur3,
-                self.joueur4,
-                self.joueur5,
-            ]
-
-            self.defenders = [
-                self.defenseur1,
-                self.defenseur2,
-                self.defenseur3,
-                self.defenseur4,
-                self.defenseur5,
-            ]
-
-            # Display an empty text object to store the text of the current situation
-            self.GLOBAL_SITUATION_TEXT = (
-                Text("").scale(1.5).to_edge(DOWN + LEFT).set_opacity(0.5)
-            )
-
-        def save_state(self, name):
-            current_state = {
-                "players": {
-                    f"joueur{i+1}": player.custom_save_state()
-                    for i, player in enumerate(self.players)
-                },
-                "ball": self.ball.save_state(),
-            }
-            self.animation_states[name] = current_state
-
-        def restore_state(self, name, new_text):
-            self.wait(2)
-            state = self.animation_states[name]
-            for key, saved_state in state["players"].items():
-                player_number = int(key[-1])
-                player = self.players[player_number - 1]
-                player.custom_restore_state(saved_state)
-            ball_state = state["ball"]
-            ball_restore_animation = Restore(ball_state, run_time=0.1)
-
-            # Update the text
-            new_text_mobject = (
-                Text(new_text).scale(1.5).to_edge(DOWN + LEFT).set_opacity(0.5)
-            )
-
-            self.play(
-                ball_restore_animation,
-                Transform(
-                    self.GLOBAL_SITUATION_TEXT,
-                    new_text_mobject,
-                ),
-            )
-            self.wait(2)
-
-        def add_node(self, moves, time_arrangement, time_between):
-            animations = []
-            for value in moves:
-                player_number = int(value[0])
-                player = self.players[player_number - 1]
-                method_name = value[-1]
-                run_time = value[-2]
-                args = value[1:-2]
-
-                if method_name == "pass_ball":
-                    target_player_number = args[0]
-                    target_player = self.players[target_player_number - 1]
-                    method = getattr(player, method_name)
-                    animations.append(
-                        method(self.ball, target_player, run_time=run_time)
-                    )
-                elif method_name == "move":
-                    positions = args
-                    # On applique convert_coordinates_to_manim pour chaque position
-                    positions = [
-                        convert_coordinates_to_manim(pos)
-                        for pos in positions
-                    ]
-                    method = getattr(player, method_name)
-                    animations.append(method(self.ball, *positions, run_time=run_time))
-                elif method_name == "shoot_ball":
-                    method = getattr(player, method_name)
-                    animations.append(method(self.ball, run_time=run_time))
-
-            animation_groups = []
-            for _, indices in time_arrangement.items():
-                group = AnimationGroup(*[animations[i] for i in indices])
-                animation_groups.append(group)
-            self.play(LaggedStart(*animation_groups, lag_ratio=time_between))
-
-        def construct(self):            
-            # ============================================================
-            # ==================== SCENE INIT ============================
-            # ============================================================
-
-            # Add the image as background
-            background = ImageMobject(BACKGROUND_PATH).scale(BACKGROUND_SCALE)
-            self.add(background)
-
-            # Write "Système 0" in the top middle of the screen
-            title = Text(scene_name).scale(0.5).move_to(UP * 3.75)
-            self.add(title)
-
-            # Display all players
-            self.add(
-                *[player.manim_object for player in self.players],
-            )
-
-            # Display defenseurs if they are not None
-            for defenseur in self.defenders:
-                if defenseur is not None:
-                    self.add(defenseur.manim_object)
-
-            # Display the ball
-            self.play(Create(self.ball))
-
-            self.wait(1)
-
-            # ============================================================
-            # ==================== SCENE ANIMATIONS =======================
-            # ============================================================
-
-            for step in animation_sequence:
-                action_type = step["type"]
-                if action_type == "move":
-                    self.add_node(
-                        moves=step["moves"],
-                        time_arrangement=step["time_arrangement"],
-                        time_between=step["time_between"],
-                    )
-                elif action_type == "save_state":
-                    self.save_state(name=step["name"])
-                elif action_type == "restore_state":
-                    self.restore_state(
-                        name=step["name"],
-                        new_text=step["new_text"],
-                    )
-                elif action_type == "wait":
-                    self.wait(step["duration"])
-                elif action_type == "write_text":
-                    text_mobject = (
-                        Text(step["text"])
-                        .scale(step.get("scale", 1.5))
-                        .to_edge(step.get("position", DOWN + LEFT))
-                        .set_opacity(step.get("opacity", 0.5))
-                    )
-                    self.play(Transform(self.GLOBAL_SITUATION_TEXT, text_mobject))
-
-            self.wait(1)
-
-    temp_file = Path("media/videos/1080p60/Systeme_basketball.mp4")
-    scene = Systeme_basketball()
-    scene.render()
-    return temp_file
+@st.cache_resource
+def get_render_job_manager():
+    """
+    File de rendus partagée entre toutes les sessions du serveur.
+    """
+    # Les processus de rendu démarrent et importent manim dès le lancement de l'application
+    manager = RenderJobManager(max_workers=RENDER_WORKERS, max_pending=RENDER_QUEUE_SIZE, initializer=warm_up)
+    manager.prestart()
+    return manager
 
 
 def get_saved_states_names():
@@ -310,37 +68,123 @@ def get_saved_states_names():
     return saved_states
 
 
+def build_animation_dict():
+    """
+    Construit le dictionnaire d'animation (format des fichiers exportés) à partir de la session.
+
+    Les positions de la session sont déjà normalisées à l'enregistrement des clics.
+    """
+    animation_dict = {"format_version": FORMAT_VERSION}
+    for i in range(NUM_JOUEURS):
+        animation_dict[f"joueur{i+1}_init_pos"] = st.session_state["player_positions"][i]
+    for i in range(NUM_DEFENSEURS):
+        animation_dict[f"defenseur{i+1}_init_pos"] = st.session_state["defenseur_positions"][i]
+    animation_dict["player_number_has_ball"] = st.session_state["player_number_has_ball"]
+    animation_dict["scene_name"] = st.session_state["scene_name"]
+    animation_dict["animation_sequence"] = st.session_state["animation_sequence"]
+    return animation_dict
+
+
 def show_player_on_court():
-    img = mpimg.imread(BACKGROUND_PATH)
-    fig, ax = plt.subplots(figsize=(10, 7))
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.imshow(img)
-
-    # Afficher les joueurs en vert avec le numéro à l'intérieur
-    for idx, pos in enumerate(st.session_state["player_positions"]):
-        if pos is not None:
-            # Convertir les coordonnées
-            pos = convert_coordinates(pos[0], pos[1], pos[2], pos[3])
-            # Afficher le joueur
-            ax.plot(pos[0], pos[1], 'o', color='green', markersize=12)
-            ax.text(pos[0], pos[1], str(idx+1), color='white', fontsize=10, fontweight='bold', ha='center', va='center')
-            # Afficher la balle en orange (juste le contour d'un cercle)
-            if idx + 1 == st.session_state["player_number_has_ball"]:
-                ball_circle = plt.Circle((pos[0], pos[1]), 20, color='orange', fill=True, linewidth=10)
-                ax.add_artist(ball_circle)
-
-    # Afficher les défenseurs en rouge avec le numéro à l'intérieur
-    if st.session_state["defenseur_active"]:
-        for idx, pos in enumerate(st.session_state["defenseur_positions"]):
-            if pos is not None:
-                # Convertir les coordonnées
-                pos = convert_coordinates(pos[0], pos[1])
-                # Afficher le défenseur
-                ax.plot(pos[0], pos[1], 'o', color='red', markersize=12)
-                ax.text(pos[0], pos[1], str(idx+1), color='white', fontsize=10, fontweight='bold', ha='center', va='center')
-    
-    return fig
+    """
+    Aperçu du placement des joueurs et des défenseurs, encodé en JPEG.
+
+    L'aperçu n'est redessiné que si les positions, le joueur avec la balle ou
+    l'affichage des défenseurs ont changé depuis un précédent affichage.
+    """
+    inputs = (
+        "placement",
+        st.session_state["player_positions"],
+        st.session_state["defenseur_positions"],
+        st.session_state["player_number_has_ball"],
+        st.session_state["defenseur_active"],
+    )
+    return st.session_state["preview_cache"].get_or_render(
+        inputs,
+        lambda: render_placement(
+            BACKGROUND_PATH,
+            PREVIEW_BACKGROUND_HEIGHT,
+            st.session_state["player_positions"],
+            st.session_state["defenseur_positions"],
+            st.session_state["player_number_has_ball"],
+            show_defenders=st.session_state["defenseur_active"],
+        ),
+    )
+
+
+def import_animation(animation_dict):
+    """
+    Remplace l'animation de la session par `animation_dict` (au format normalisé).
+    """
+    st.session_state["player_positions"] = [animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)]
+    st.session_state["defenseur_positions"] = [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]
+    st.session_state["player_number_has_ball"] = animation_dict["player_number_has_ball"]
+    st.session_state["scene_name"] = animation_dict["scene_name"]
+    st.session_state.animation_sequence = animation_dict["animation_sequence"]
+
+
+def playbook_browser(file_obj):
+    """
+    Parcourt une archive de playbook et importe la play choisie.
+
+    Seul l'index de l'archive est lu pour afficher la liste des plays ; la play
+    choisie n'est décodée qu'au moment de l'import. Si l'archive contient la vidéo de
+    la play dans la qualité choisie, elle est affichée pour cette session uniquement.
+    """
+    try:
+        archive = PlaybookArchive(file_obj)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    with archive:
+        tags = sorted({tag for entry in archive.entries for tag in entry["tags"]})
+        selected_tags = st.multiselect("Filtrer par tags", tags) if tags else []
+        entries = [entry for entry in archive.entries if set(selected_tags) <= set(entry["tags"])]
+        if not entries:
+            st.info("Aucune play ne correspond à ces tags.")
+            return
+
+        st.dataframe(
+            [
+                {
+                    "Nom": entry["name"],
+                    "Nodes": entry["nodes"],
+                    "Durée (s)": entry["duration"],
+                    "Tags": ", ".join(entry["tags"]),
+                    "Vidéos": ", ".join(entry["videos"]),
+                }
+                for entry in entries
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        play_id = st.selectbox(
+            "Play à importer",
+            [entry["id"] for entry in entries],
+            format_func=lambda play_id: archive.entry(play_id)["name"],
+        )
+        col_thumbnail, col_import = st.columns([2, 1], vertical_alignment="center")
+        thumbnail = archive.thumbnail(play_id)
+        if thumbnail is not None:
+            col_thumbnail.image(thumbnail, use_container_width=True)
+        if col_import.button("Importer cette play", use_container_width=True):
+            animation_dict = archive.load(play_id)
+            # Rien ne garantit que la vidéo d'une archive envoyée corresponde à sa play : elle n'est
+            # montrée qu'à cette session, sans passer par le cache de rendu partagé entre les sessions
+            try:
+                video = archive.video(play_id, quality_tag(st.session_state["render_quality"]))
+            except KeyError:
+                video = None
+            if video is not None:
+                video_file = new_job_dir(RENDER_JOBS_DIR, tag="archive") / f"{play_id}.mp4"
+                video_file.write_bytes(video)
+                st.session_state["video_file"] = str(video_file)
+                st.session_state["video_cache_key"] = None
+                st.session_state["video_offset"] = 0.0
+            import_animation(animation_dict)
+            st.toast(f"Play « {animation_dict['scene_name']} » importée.")
+            st.rerun()
 
 
 # ========================================================
@@ -368,9 +212,9 @@ def positionnement_joueurs(numero_joueur, type="Joueur"):
     if last_coordinates:
         # On récupère les coordonnées du dernier clic avec la taille et la largeur
         x, y, width, height = last_coordinates["x"], last_coordinates["y"], last_coordinates["width"], last_coordinates["height"]
-        # On ajoute la position à la liste des positions
+        # On ajoute la position normalisée (indépendante de la taille de l'image affichée)
         key_session = "player_positions" if type == "player" else "defenseur_positions"
-        st.session_state[key_session][numero_joueur - 1] = (x, y, width, height)
+        st.session_state[key_session][numero_joueur - 1] = normalize_click((x, y, width, height))
         # On ferme le modal
         st.rerun()
 
@@ -387,33 +231,191 @@ def generate_animation():
         message_place("Veuillez ajouter au moins un node à l'animation.")
         return
     
-    st.toast("Génération de l'animation en cours...")
-    # Construction du dictionnaire
-    animation_dict = {
-        "joueur1_init_pos": st.session_state["player_positions"][0],
-        "joueur2_init_pos": st.session_state["player_positions"][1],
-        "joueur3_init_pos": st.session_state["player_positions"][2],
-        "joueur4_init_pos": st.session_state["player_positions"][3],
-        "joueur5_init_pos": st.session_state["player_positions"][4],
-        "defenseur1_init_pos": st.session_state["defenseur_positions"][0],
-        "defenseur2_init_pos": st.session_state["defenseur_positions"][1],
-        "defenseur3_init_pos": st.session_state["defenseur_positions"][2],
-        "defenseur4_init_pos": st.session_state["defenseur_positions"][3],
-        "defenseur5_init_pos": st.session_state["defenseur_positions"][4],
-        "player_number_has_ball": st.session_state["player_number_has_ball"],
-        "scene_name": st.session_state["scene_name"],
-        "animation_sequence": st.session_state["animation_sequence"]
-    }
+    animation_dict = build_animation_dict()
+
+    # Les erreurs de la séquence (passe sans la balle, état jamais sauvegardé...) sont signalées avant le rendu
+    blocking = validation_errors(validate_animation(animation_dict))
+    if blocking:
+        message_place("Animation invalide :\n\n" + "\n".join(f"- {issue}" for issue in blocking))
+        return
     
+    # Seule la plage de nodes choisie est rendue ; sa vidéo commence au début de son premier node
+    nodes = st.session_state.get("render_nodes")
+    index = TimelineIndex(animation_dict["animation_sequence"])
+    video_offset = index.starts[nodes[0]] if nodes is not None and nodes[0] > 0 else 0.0
+
+    # Une animation identique déjà rendue est renvoyée directement depuis le cache
+    quality = st.session_state["render_quality"]
+    cache_key = animation_cache_key(animation_dict, quality=quality_tag(quality), nodes=nodes)
+    video_file = get_render_cache().get(cache_key)
+    if video_file is not None:
+        st.toast("Vidéo récupérée depuis le cache.")
+        st.session_state["video_file"] = str(video_file)
+        st.session_state["video_offset"] = video_offset
+        st.session_state["video_cache_key"] = cache_key
+        # Comme pour un nouveau rendu : le suivi et l'erreur d'un rendu précédent ne concernent plus cette vidéo
+        st.session_state["render_job_id"] = None
+        st.session_state["render_error"] = None
+        if st.session_state.get("render_stream_dir"):
+            remove_job_dir(st.session_state["render_stream_dir"])
+            st.session_state["render_stream_dir"] = None
+        st.session_state["partial_video"] = None
+        st.rerun()
+
+    # Sinon le rendu est envoyé à la file de rendu, et l'interface suit son avancement.
+    # Les segments terminés sont publiés dans stream_dir : le début de la vidéo est lisible pendant le rendu
+    stream_dir = new_job_dir(RENDER_JOBS_DIR, tag="stream")
+    manager = get_render_job_manager()
+    # Les cœurs sont partagés avec les rendus déjà en cours : chaque rendu lance son propre pool de scénarios
+    scenario_workers = max(1, SCENARIO_WORKERS // (manager.pending_count() + 1))
     try:
-        video_file = create_manim_animation(animation_dict['animation_sequence'])
-        st.toast("Vidéo générée avec succès !")
-        video_place.video(str(video_file), autoplay=True)
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        message_place(f"Erreur lors de la génération de la vidéo : {e}")
-        if DEBUG:
-            print(error_trace)
+        job_id = manager.submit(
+            render_to_cache, animation_dict, cache_key, quality,
+            nodes=nodes, workers=scenario_workers, stream_dir=stream_dir,
+        )
+    except RenderQueueFull as e:
+        remove_job_dir(stream_dir)
+        message_place(f"{e} Veuillez réessayer dans quelques instants.")
+        return
+    st.toast("Génération de l'animation en cours...")
+    st.session_state["render_job_id"] = job_id
+    # Appliqués à la vidéo affichée seulement quand le rendu réussit (voir render_job_panel)
+    st.session_state["render_job_video"] = {"offset": video_offset, "cache_key": cache_key}
+    st.session_state["render_stream_dir"] = str(stream_dir)
+    st.session_state["partial_video"] = None
+    st.session_state["render_error"] = None
+    st.rerun()
+
+
+def partial_video_panel(stream_dir):
+    """
+    Affiche le début de la vidéo déjà rendu, pendant le rendu des nodes suivants.
+
+    La vidéo partielle n'est pas remplacée automatiquement quand d'autres segments sont prêts,
+    pour ne pas interrompre sa lecture.
+    """
+    ready, total = ready_segments(stream_dir)
+    if not ready:
+        return
+    shown = st.session_state.get("partial_video")
+    if shown is not None and shown[1] < len(ready):
+        st.caption(f"{len(ready) - shown[1]} segment(s) de plus sont prêts.")
+        if st.button("Mettre à jour la vidéo partielle", key="update_partial_video"):
+            shown = None
+    if shown is None:
+        partial_file = Path(stream_dir) / f"partial_{len(ready)}.mp4"
+        if not partial_file.exists():
+            concat_videos(ready, partial_file)
+        shown = st.session_state["partial_video"] = (str(partial_file), len(ready))
+    st.caption(f"Vidéo partielle : {shown[1]} segment(s) sur {total}")
+    st.video(shown[0], autoplay=True)
+
+
+def render_profile_panel(cache_key):
+    """
+    Résumé des mesures du rendu qui a produit la vidéo affichée (voir profiling.py), s'il y en a.
+    """
+    profile = load_metrics(RENDER_METRICS_DIR, cache_key) if cache_key else None
+    if profile is None:
+        return
+    with st.expander("Profil du rendu"):
+        col_time, col_frames, col_memory = st.columns(3)
+        col_time.metric("Durée du rendu", f"{profile['seconds']:.1f} s")
+        col_frames.metric("Images rendues", profile["frames"])
+        if profile.get("process_peak_memory") is not None:
+            col_memory.metric(
+                "Mémoire max. du processus", f"{profile['process_peak_memory'] / 1024**2:.0f} Mo",
+                help="Maximum atteint par le processus de rendu depuis son démarrage, tous rendus confondus.",
+            )
+        st.caption(
+            "Temps par phase. L'encodage (encode) se fait dans un thread séparé, en parallèle de play ; "
+            "les phases des processus de scénarios s'additionnent."
+        )
+        st.dataframe(
+            [
+                {"Phase": name, "Temps (s)": round(entry["seconds"], 2), "Appels": entry["count"]}
+                for name, entry in sorted(profile["phases"].items(), key=lambda item: -item[1]["seconds"])
+            ],
+            hide_index=True,
+        )
+        if profile["nodes"]:
+            st.caption("Segments rendus (les segments déjà en cache n'apparaissent pas).")
+            st.dataframe(
+                [
+                    {
+                        "Segment": node["segment"],
+                        "Node": node["type"] or node["kind"],
+                        "Temps (s)": round(node["seconds"], 2),
+                        "Images": node["frames"],
+                    }
+                    for node in profile["nodes"]
+                ],
+                hide_index=True,
+            )
+
+
+@st.fragment(run_every=RENDER_POLL_INTERVAL if st.session_state.get("render_job_id") else None)
+def render_job_panel():
+    """
+    Affiche la vidéo générée, ou l'avancement du rendu en cours.
+
+    Tant qu'un rendu est en cours, ce fragment est réexécuté toutes les
+    RENDER_POLL_INTERVAL secondes sans bloquer le reste de l'interface.
+    """
+    job_id = st.session_state.get("render_job_id")
+    if job_id is not None:
+        manager = get_render_job_manager()
+        try:
+            status = manager.status(job_id)
+        except KeyError:
+            # Le serveur a redémarré entre temps : le rendu est perdu
+            status = "cancelled"
+
+        if status in ("queued", "running"):
+            if status == "queued":
+                st.info("Rendu en file d'attente...")
+            else:
+                st.info("Génération de l'animation en cours...")
+            if st.button("Annuler le rendu", key="cancel_render"):
+                if manager.cancel(job_id):
+                    st.session_state["render_job_id"] = None
+                    if st.session_state.get("render_stream_dir"):
+                        remove_job_dir(st.session_state["render_stream_dir"])
+                        st.session_state["render_stream_dir"] = None
+                    st.rerun()
+                st.warning("Le rendu a déjà commencé et ne peut plus être annulé.")
+            if status == "running" and st.session_state.get("render_stream_dir"):
+                partial_video_panel(st.session_state["render_stream_dir"])
+            return
+
+        st.session_state["render_job_id"] = None
+        if st.session_state.get("render_stream_dir"):
+            # La vidéo complète est dans le cache de rendu : les segments publiés ne servent plus
+            remove_job_dir(st.session_state["render_stream_dir"])
+            st.session_state["render_stream_dir"] = None
+        if status == "done":
+            st.session_state["video_file"] = str(manager.result(job_id))
+            job_video = st.session_state.get("render_job_video") or {}
+            st.session_state["video_offset"] = job_video.get("offset", 0.0)
+            st.session_state["video_cache_key"] = job_video.get("cache_key")
+            st.toast("Vidéo générée avec succès !")
+        elif status == "failed":
+            try:
+                manager.result(job_id)
+            except Exception as e:
+                st.session_state["render_error"] = f"Erreur lors de la génération de la vidéo : {e}"
+                if DEBUG:
+                    print(traceback.format_exc())
+        # Rerun complet pour arrêter le suivi périodique du fragment
+        st.rerun()
+
+    if st.session_state.get("render_error"):
+        st.error(st.session_state["render_error"])
+    if st.session_state.get("video_file"):
+        render_profile_panel(st.session_state.get("video_cache_key"))
+        st.video(st.session_state["video_file"], autoplay=True, start_time=int(max(0, st.session_state.get("video_start_time", 0) - st.session_state.get("video_offset", 0))))
+    else:
+        st.info("Aucune vidéo générée.")
 
 
 # ========================================================
@@ -433,6 +435,10 @@ if "scene_name" not in st.session_state:
     st.session_state["scene_name"] = "Système de jeu"  # Nom de la scène
 if "uploaded_file" not in st.session_state:
     st.session_state["uploaded_file"] = None
+if "preview_cache" not in st.session_state:
+    st.session_state["preview_cache"] = PreviewCache(max_entries=PREVIEW_CACHE_SIZE)  # Aperçus déjà encodés
+if "render_quality" not in st.session_state:
+    st.session_state["render_quality"] = DEFAULT_RENDER_QUALITY  # Qualité de la vidéo générée
 
 _, main_col, _ = st.columns([1, 5, 1])
 
@@ -451,12 +457,20 @@ with main_col:
     # =========================================================
     
     st.header(":blue[Paramètres] de l'animation", divider='blue')
-    row2 = row([1, 3], vertical_align="center")
+    row2 = row([1, 3, 1], vertical_align="center")
     player_number_has_ball = row2.number_input("Joueur avec la balle", min_value=1, max_value=5, value=st.session_state["player_number_has_ball"], step=1)
     scene_name = row2.text_input("Nom de la scène", value=st.session_state["scene_name"], placeholder="Système de jeu", max_chars=50)
+    render_quality = row2.selectbox(
+        "Qualité de la vidéo",
+        options=list(RENDER_QUALITIES),
+        index=list(RENDER_QUALITIES).index(st.session_state["render_quality"]),
+        format_func=lambda quality: RENDER_QUALITIES[quality]["label"],
+        help="Le brouillon est beaucoup plus rapide à générer, pour ajuster le rythme de l'animation.",
+    )
     
     st.session_state["player_number_has_ball"] = player_number_has_ball
     st.session_state["scene_name"] = scene_name
+    st.session_state["render_quality"] = render_quality
 
     add_vertical_space(SPACE_BETWEEN_SECTIONS)
 
@@ -475,8 +489,7 @@ with main_col:
     col_img_placement, col_player_pick_placement = st.columns([3, 1], gap="medium", vertical_alignment="center")
     
     with col_img_placement:
-        fig = show_player_on_court()
-        st.pyplot(fig)
+        st.image(show_player_on_court(), use_container_width=True)
     
     with col_player_pick_placement:
         # Pour les joueurs
@@ -567,7 +580,7 @@ with main_col2:
                             coords = streamlit_image_coordinates(BACKGROUND_PATH, use_column_width=True, key=f"terrain_{key_positions_move}")
 
                             if coords:
-                                new_point = (coords["x"], coords["y"], coords["width"], coords["height"])
+                                new_point = normalize_click((coords["x"], coords["y"], coords["width"], coords["height"]))
                                 if not st.session_state[key_positions_move] or st.session_state[key_positions_move][-1] != new_point:
                                     st.session_state[key_positions_move].append(new_point)
                                     st.rerun()
@@ -588,17 +601,13 @@ with main_col2:
                     st.write(f"Positions enregistrées: {len(positions)}")
 
                     if st.session_state[key_positions_finished] and positions:
-                        fig, ax = plt.subplots(figsize=(10, 7))
-                        img = mpimg.imread(BACKGROUND_PATH)
-                        ax.imshow(img)
-                        ax.axis('off')
-
-                        for idx, pos in enumerate(positions):
-                            points_coor_x, points_coor_y = convert_coordinates(pos[0], pos[1], pos[2], pos[3])
-                            ax.plot(points_coor_x, points_coor_y, 'o', color='blue', markersize=12)
-                            ax.text(points_coor_x, points_coor_y, str(idx+1), color='white', fontsize=10, ha='center', va='center')
-
-                        st.pyplot(fig, use_container_width=True)
+                        st.image(
+                            st.session_state["preview_cache"].get_or_render(
+                                ("path", positions),
+                                lambda: render_path(BACKGROUND_PATH, PREVIEW_BACKGROUND_HEIGHT, positions),
+                            ),
+                            use_container_width=True,
+                        )
 
                     with col3:
                         run_time = st.number_input(
@@ -760,6 +769,8 @@ with main_col2:
                 
                 add_vertical_space(2)
                 st.pyplot(fig)
+                # Les figures pyplot restent en mémoire tant qu'elles ne sont pas fermées
+                plt.close(fig)
 
         add_vertical_space(2)
 
@@ -888,22 +899,7 @@ _, end_main_col, _ = st.columns([1, 5, 1], gap="large")
 with end_main_col:
     st.header(":blue[Description] en langage naturel", divider='blue')
 
-    # Construction du dictionnaire
-    animation_dict = {
-        "joueur1_init_pos": st.session_state["player_positions"][0],
-        "joueur2_init_pos": st.session_state["player_positions"][1],
-        "joueur3_init_pos": st.session_state["player_positions"][2],
-        "joueur4_init_pos": st.session_state["player_positions"][3],
-        "joueur5_init_pos": st.session_state["player_positions"][4],
-        "defenseur1_init_pos": st.session_state["defenseur_positions"][0],
-        "defenseur2_init_pos": st.session_state["defenseur_positions"][1],
-        "defenseur3_init_pos": st.session_state["defenseur_positions"][2],
-        "defenseur4_init_pos": st.session_state["defenseur_positions"][3],
-        "defenseur5_init_pos": st.session_state["defenseur_positions"][4],
-        "player_number_has_ball": st.session_state["player_number_has_ball"],
-        "scene_name": st.session_state["scene_name"],
-        "animation_sequence": st.session_state["animation_sequence"]
-    }
+    animation_dict = build_animation_dict()
 
     # for i, node in enumerate(animation_dict["animation_sequence"]):
         # st.write(f"**Node {i + 1}** : {node_to_natural_language(node)}")
@@ -1015,13 +1011,62 @@ with end_main_col:
 
     add_vertical_space(SPACE_BETWEEN_SECTIONS)
 
+    # ==========================================================
+    # ==================== APERÇU ==============================
+    # ==========================================================
+
+    st.header(":blue[Aperçu] de l'animation", divider='blue')
+    st.caption("Aperçu instantané de la séquence, joué directement dans le navigateur. La vidéo finale est générée plus bas.")
+    if any(pos is None for pos in st.session_state["player_positions"]) or not st.session_state["animation_sequence"]:
+        st.info("Positionnez les joueurs et ajoutez au moins un node pour afficher l'aperçu.")
+    else:
+        issues = validate_animation(animation_dict)
+        for issue in issues:
+            (st.error if issue.severity == VALIDATION_ERROR else st.warning)(str(issue))
+        if not validation_errors(issues):
+            # Aller directement à un node : l'aperçu et la vidéo démarrent au début de ce node
+            index = TimelineIndex(animation_dict["animation_sequence"])
+            start_node = st.selectbox(
+                "Aller au node",
+                [None, *range(len(index))],
+                format_func=lambda i: "Début de l'animation" if i is None else f"Node {i + 1} : {index.types[i]} ({index.starts[i]:.1f} s)",
+                key="scrub_node",
+            )
+            start_time = 0.0 if start_node is None else index.starts[start_node]
+            st.session_state["video_start_time"] = start_time
+
+            timeline = st.session_state["preview_cache"].get_or_render(
+                ("timeline", animation_dict),
+                lambda: build_timeline(animation_dict),
+            )
+            player_html = playback_html(
+                timeline,
+                background_data_url(BACKGROUND_PATH, PREVIEW_BACKGROUND_HEIGHT),
+                start_time=start_time,
+                autoplay=start_node is not None,
+            )
+            components.html(player_html, height=PLAYBACK_COMPONENT_HEIGHT)
+
+    add_vertical_space(SPACE_BETWEEN_SECTIONS)
+
     # ==========================================================
     # ==================== VIDEO ===============================
     # ==========================================================
 
     st.header(":blue[Vidéo] de l'animation", divider='blue')
-    video_place = st.empty()
-    video_place.info("Aucune vidéo générée.")
+    num_nodes = len(st.session_state["animation_sequence"])
+    if num_nodes > 1:
+        first_node, last_node = st.select_slider(
+            "Nodes à rendre",
+            options=list(range(1, num_nodes + 1)),
+            value=(1, num_nodes),
+            key=f"render_nodes_{num_nodes}",
+            help="Pour revoir une seule branche (par exemple après un restore_state) sans rendre toute la séquence.",
+        )
+        st.session_state["render_nodes"] = None if (first_node, last_node) == (1, num_nodes) else (first_node - 1, last_node)
+    else:
+        st.session_state["render_nodes"] = None
+    render_job_panel()
     
     add_vertical_space(SPACE_BETWEEN_SECTIONS)
     
@@ -1031,28 +1076,22 @@ with end_main_col:
     st.header(":blue[Exporter] l'animation", divider='blue')
     st.caption("Vous pouvez ici exporter l'animation au format txt pour la réutiliser plus tard. Ce la conservera tous les paramètres de l'animation. (pas la vidéo)")
     # télécharger le json d'animation 
-    animation_dict = {
-        "joueur1_init_pos": st.session_state["player_positions"][0],
-        "joueur2_init_pos": st.session_state["player_positions"][1],
-        "joueur3_init_pos": st.session_state["player_positions"][2],
-        "joueur4_init_pos": st.session_state["player_positions"][3],
-        "joueur5_init_pos": st.session_state["player_positions"][4],
-        "defenseur1_init_pos": st.session_state["defenseur_positions"][0],
-        "defenseur2_init_pos": st.session_state["defenseur_positions"][1],
-        "defenseur3_init_pos": st.session_state["defenseur_positions"][2],
-        "defenseur4_init_pos": st.session_state["defenseur_positions"][3],
-        "defenseur5_init_pos": st.session_state["defenseur_positions"][4],
-        "player_number_has_ball": st.session_state["player_number_has_ball"],
-        "scene_name": st.session_state["scene_name"],
-        "animation_sequence": st.session_state["animation_sequence"]
-    }
+    animation_dict = build_animation_dict()
     json_file = json.dumps(animation_dict, indent=4)
-    st.download_button(
+    row_export = row(2, vertical_align="center")
+    row_export.download_button(
         label="Télécharger le fichier en format txt",
         data=json_file,
         file_name=f"{st.session_state["scene_name"]}.txt",
         icon="📥",
     )
+    # Le format binaire est bien plus compact, pour les playbooks de nombreuses plays
+    row_export.download_button(
+        label=f"Télécharger le fichier en format binaire ({PLAYBOOK_EXTENSION})",
+        data=play_to_bytes(animation_dict),
+        file_name=f"{st.session_state["scene_name"]}{PLAYBOOK_EXTENSION}",
+        icon="📦",
+    )
     
     add_vertical_space(SPACE_BETWEEN_SECTIONS)
     
@@ -1060,7 +1099,15 @@ with end_main_col:
     # ============== IMPORTER UNE ANIMATION ====================
     # ==========================================================
     st.header(":blue[Importer] une animation", divider='blue')
-    uploaded_file = st.file_uploader("Télécharger une animation au format txt", type=["txt"], key="uploader")
+    uploaded_file = st.file_uploader(
+        f"Télécharger une animation au format txt ou {PLAYBOOK_EXTENSION}, ou une archive de playbook ({ARCHIVE_EXTENSION})",
+        type=["txt", PLAYBOOK_EXTENSION.lstrip("."), ARCHIVE_EXTENSION.lstrip(".")],
+        key="uploader",
+    )
+
+    # Une archive contient de nombreuses plays : on la parcourt et on choisit la play à importer
+    if uploaded_file is not None and uploaded_file.name.endswith(ARCHIVE_EXTENSION):
+        playbook_browser(uploaded_file)
 
     # Stocker le nom du fichier dans la session pour comparer ultérieurement
     if uploaded_file is not None:
@@ -1068,20 +1115,30 @@ with end_main_col:
         st.session_state["uploaded_file_name"] = uploaded_file.name
 
     # Traiter le fichier uploadé uniquement si le fichier est présent et que l'import n'a pas encore été effectué
-    if st.session_state.get("uploaded_file") is not None and not st.session_state.get("animation_imported", False):
+    if (
+        st.session_state.get("uploaded_file") is not None
+        and not st.session_state["uploaded_file"].name.endswith(ARCHIVE_EXTENSION)
+        and not st.session_state.get("animation_imported", False)
+    ):
         file_obj = st.session_state["uploaded_file"]
         file_obj.seek(0)  # S'assurer que le curseur est au début
         file_content = file_obj.read()
         try:
-            animation_dict = json.loads(file_content)
-        except Exception as e:
+            if file_obj.name.endswith(PLAYBOOK_EXTENSION):
+                # Playbook binaire : on importe sa première play
+                play = next(iter_plays(io.BytesIO(file_content)), None)
+                if play is None:
+                    raise ValueError("le playbook ne contient aucune play")
+                animation_dict = play.to_dict()
+            else:
+                # Les anciens fichiers (positions en clics bruts) sont mis au format normalisé
+                animation_dict = upgrade_animation_dict(json.loads(file_content))
+        except json.JSONDecodeError as e:
             st.error(f"Erreur lors du décodage du fichier JSON : {e}")
+        except (KeyError, ValueError) as e:
+            st.error(f"Fichier d'animation invalide : {e}")
         else:
-            st.session_state["player_positions"] = [animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)]
-            st.session_state["defenseur_positions"] = [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]
-            st.session_state["player_number_has_ball"] = animation_dict["player_number_has_ball"]
-            st.session_state["scene_name"] = animation_dict["scene_name"]
-            st.session_state.animation_sequence = animation_dict["animation_sequence"]
+            import_animation(animation_dict)
             st.session_state["animation_imported"] = True  # flag pour éviter la boucle
             st.toast("Animation importée avec succès.")
             st.balloons()
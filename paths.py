@@ -0,0 +1,130 @@
+"""
+Trajectoires lisses des déplacements, calculées comme dans manim mais sans manim.
+
+`Player.move` construit un `VMobject` avec `set_points_smoothly` puis le parcourt avec
+`MoveAlongPath` (vitesse linéaire). Les fonctions ci-dessous reproduisent ces deux
+étapes : les poignées des courbes de Bézier cubiques sont celles de
+`get_smooth_open_cubic_bezier_handle_points`, et la position à une proportion donnée
+suit `VMobject.point_from_proportion` (longueur de chaque courbe approchée par
+10 échantillons, paramètre de Bézier linéaire à l'intérieur d'une courbe).
+"""
+import numpy as np
+
+
+CURVE_LENGTH_SAMPLES = 10  # Valeur par défaut de manim pour approcher la longueur d'une courbe
+
+
+def smooth_bezier_curves(anchors):
+    """
+    Calcule les courbes de Bézier cubiques d'une trajectoire lisse passant par `anchors`.
+
+    Parameters
+    ----------
+    anchors : array-like
+        Les points de passage, de forme (N + 1, dim).
+
+    Returns
+    -------
+    np.ndarray
+        Les points de contrôle des N courbes, de forme (N, 4, dim).
+    """
+    A = np.asarray(anchors, dtype=float)
+    N = A.shape[0] - 1
+    if N < 1:
+        return np.zeros((0, 4, A.shape[1]))
+    if N == 1:
+        # Deux points : les poignées à 1/3 et 2/3 donnent un segment de droite
+        h1 = A[:1] + (A[1:] - A[:1]) / 3
+        h2 = A[:1] + 2 * (A[1:] - A[:1]) / 3
+        return np.stack([A[:-1], h1, h2, A[1:]], axis=1)
+
+    # Système tridiagonal des premières poignées, résolu par l'algorithme de Thomas
+    lower = np.ones(N - 1)
+    lower[-1] = 2
+    diag = np.full(N, 4.0)
+    diag[0] = 2
+    diag[-1] = 7
+    rhs = np.empty_like(A[:-1])
+    rhs[0] = A[0] + 2 * A[1]
+    rhs[1:-1] = 4 * A[1:N - 1] + 2 * A[2:N]
+    rhs[-1] = 8 * A[N - 1] + A[N]
+
+    for i in range(1, N):
+        w = lower[i - 1] / diag[i - 1]
+        diag[i] -= w  # La diagonale supérieure ne contient que des 1
+        rhs[i] -= w * rhs[i - 1]
+    h1 = np.empty_like(rhs)
+    h1[-1] = rhs[-1] / diag[-1]
+    for i in range(N - 2, -1, -1):
+        h1[i] = (rhs[i] - h1[i + 1]) / diag[i]
+
+    h2 = np.empty_like(h1)
+    h2[:-1] = 2 * A[1:N] - h1[1:]
+    h2[-1] = 0.5 * (A[N] + h1[-1])
+    return np.stack([A[:-1], h1, h2, A[1:]], axis=1)
+
+
+def _bezier_points(curves, t):
+    """
+    Évalue chaque courbe aux paramètres `t` : renvoie un tableau (nb courbes, len(t), dim).
+    """
+    t = np.asarray(t, dtype=float)[None, :, None]
+    p0, p1, p2, p3 = (curves[:, i, None, :] for i in range(4))
+    mt = 1 - t
+    return mt**3 * p0 + 3 * mt**2 * t * p1 + 3 * mt * t**2 * p2 + t**3 * p3
+
+
+class SmoothPath:
+    """
+    Trajectoire lisse parcourue à vitesse linéaire, comme `MoveAlongPath` sur `set_points_smoothly`.
+
+    Usage
+    -----
+    >>> path = SmoothPath([(0, 0), (1, 1), (2, 0)])
+    >>> path.points_at([0, 0.5, 1])
+    """
+
+    __slots__ = ("curves", "cumulative_lengths")
+
+    def __init__(self, anchors):
+        self.curves = smooth_bezier_curves(anchors)
+        samples = _bezier_points(self.curves, np.linspace(0, 1, CURVE_LENGTH_SAMPLES))
+        lengths = np.linalg.norm(np.diff(samples, axis=1), axis=2).sum(axis=1)
+        self.cumulative_lengths = np.concatenate([[0.0], np.cumsum(lengths)])
+
+    def points_at(self, proportions):
+        """
+        Positions aux proportions `proportions` (entre 0 et 1) du parcours.
+
+        Returns
+        -------
+        np.ndarray
+            Un tableau (len(proportions), dim).
+        """
+        proportions = np.clip(np.asarray(proportions, dtype=float), 0, 1)
+        if len(self.curves) == 0:
+            raise ValueError("Une trajectoire a besoin d'au moins deux points")
+
+        total = self.cumulative_lengths[-1]
+        target = proportions * total
+        # Première courbe dont la fin atteint la longueur visée
+        index = np.searchsorted(self.cumulative_lengths[1:], target, side="left")
+        index = np.minimum(index, len(self.curves) - 1)
+        lengths = self.cumulative_lengths[index + 1] - self.cumulative_lengths[index]
+        residue = np.divide(
+            target - self.cumulative_lengths[index],
+            lengths,
+            out=np.zeros_like(target),
+            where=lengths != 0,
+        )
+
+        curves = self.curves[index]
+        t = residue[:, None]
+        mt = 1 - t
+        points = (
+            mt**3 * curves[:, 0] + 3 * mt**2 * t * curves[:, 1]
+            + 3 * mt * t**2 * curves[:, 2] + t**3 * curves[:, 3]
+        )
+        # Comme manim, la proportion 1 donne exactement le dernier point
+        points[proportions == 1] = self.curves[-1, 3]
+        return points
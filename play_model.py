@@ -0,0 +1,278 @@
+"""
+Modèle compact d'une animation (une « play »), normalisé une seule fois au chargement.
+
+Les positions sont stockées dans l'espace normalisé du terrain (points [u, v] entre 0 et 1,
+voir `coordinates`), indépendant de la taille de l'image affichée dans le navigateur lors
+des clics. Les nodes sont des enregistrements à `__slots__` ; les actions d'un node
+d'actions sont rangées dans des tableaux NumPy plutôt que dans des listes hétérogènes
+`[numéro_joueur, *positions, run_time, action]`.
+
+Le format dictionnaire (celui des fichiers exportés, de `Systeme_basketball` et du cache de
+rendu) reste le format d'échange : `Play.from_dict` lit aussi les anciens fichiers, dont les
+positions sont des clics bruts, et `Play.to_dict` écrit le format normalisé.
+
+Usage
+-----
+>>> play = Play.from_dict(json.loads(Path("systeme.txt").read_text()))
+>>> animation_dict = play.to_dict()
+"""
+import numpy as np
+
+from coordinates import clicks_to_unit
+
+
+FORMAT_VERSION = 2  # 1 : positions en clics bruts [x, y, width, height] ; 2 : points normalisés [u, v]
+NUM_JOUEURS = 5
+NUM_DEFENSEURS = 5
+ACTION_KINDS = ("move", "pass_ball", "shoot_ball")  # L'indice sert de code dans MoveNode.kinds
+NO_TARGET = 0  # Valeur de MoveNode.targets pour une action sans receveur
+
+
+def _unit_points(positions):
+    """
+    Normalise une liste de positions dont certaines valent None en un tableau (N, 2), NaN pour None.
+    """
+    points = np.full((len(positions), 2), np.nan)
+    present = [i for i, pos in enumerate(positions) if pos is not None]
+    if present:
+        points[present] = clicks_to_unit([positions[i] for i in present])
+    return points
+
+
+def _optional_points(points):
+    """
+    Inverse de `_unit_points` : une liste de points [u, v], None pour les lignes NaN.
+    """
+    return [None if np.isnan(point).any() else point.tolist() for point in points]
+
+
+# ========== Nodes ==========
+
+class MoveNode:
+    """
+    Node d'actions jouées en parallèle, regroupées et décalées dans le temps.
+
+    L'action i est faite par le joueur `players[i]`, est de type `ACTION_KINDS[kinds[i]]`,
+    dure `run_times[i]` secondes, et passe la balle au joueur `targets[i]` (pass_ball) ou
+    suit les points `points[path_offsets[i]:path_offsets[i + 1]]` (move).
+    """
+
+    __slots__ = ("players", "kinds", "targets", "run_times", "path_offsets", "points", "groups", "time_between")
+    type = "move"
+
+    def __init__(self, players, kinds, targets, run_times, path_offsets, points, groups, time_between):
+        self.players = np.asarray(players, dtype=np.int8)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.targets = np.asarray(targets, dtype=np.int8)
+        self.run_times = np.asarray(run_times, dtype=float)
+        self.path_offsets = np.asarray(path_offsets, dtype=np.int32)
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.groups = groups  # ((clé, (indices des actions)), ...) dans l'ordre de time_arrangement
+        self.time_between = time_between
+
+    def __len__(self):
+        return len(self.players)
+
+    def path(self, i):
+        """
+        Points [u, v] du déplacement de l'action i (vide si ce n'est pas un déplacement).
+        """
+        return self.points[self.path_offsets[i]:self.path_offsets[i + 1]]
+
+    @classmethod
+    def from_dict(cls, node):
+        moves = node["moves"]
+        players, kinds, targets, run_times, offsets, positions = [], [], [], [], [0], []
+        for value in moves:
+            kind = value[-1]
+            if kind not in ACTION_KINDS:
+                raise ValueError(f"Action inconnue : {kind!r}")
+            players.append(int(value[0]))
+            kinds.append(ACTION_KINDS.index(kind))
+            run_times.append(value[-2])
+            args = value[1:-2]
+            targets.append(int(args[0]) if kind == "pass_ball" else NO_TARGET)
+            if kind == "move":
+                positions.extend(args)
+            offsets.append(len(positions))
+        # Tous les points du node sont normalisés en un seul appel
+        points = clicks_to_unit(positions) if positions else np.zeros((0, 2))
+        groups = tuple((key, tuple(indices)) for key, indices in node["time_arrangement"].items())
+        return cls(players, kinds, targets, run_times, offsets, points, groups, node["time_between"])
+
+    def to_dict(self):
+        moves = []
+        for i in range(len(self)):
+            kind = ACTION_KINDS[self.kinds[i]]
+            if kind == "move":
+                args = self.path(i).tolist()
+            elif kind == "pass_ball":
+                args = [int(self.targets[i])]
+            else:
+                args = []
+            moves.append([str(self.players[i]), *args, float(self.run_times[i]), kind])
+        return {
+            "type": self.type,
+            "moves": moves,
+            "time_arrangement": {key: list(indices) for key, indices in self.groups},
+            "time_between": self.time_between,
+        }
+
+
+class SaveStateNode:
+    __slots__ = ("name",)
+    type = "save_state"
+
+    def __init__(self, name):
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, node):
+        return cls(node["name"])
+
+    def to_dict(self):
+        return {"type": self.type, "name": self.name}
+
+
+class RestoreStateNode:
+    __slots__ = ("name", "new_text")
+    type = "restore_state"
+
+    def __init__(self, name, new_text):
+        self.name = name
+        self.new_text = new_text
+
+    @classmethod
+    def from_dict(cls, node):
+        return cls(node["name"], node["new_text"])
+
+    def to_dict(self):
+        return {"type": self.type, "name": self.name, "new_text": self.new_text}
+
+
+class WaitNode:
+    __slots__ = ("duration",)
+    type = "wait"
+
+    def __init__(self, duration):
+        self.duration = duration
+
+    @classmethod
+    def from_dict(cls, node):
+        return cls(node["duration"])
+
+    def to_dict(self):
+        return {"type": self.type, "duration": self.duration}
+
+
+class WriteTextNode:
+    """
+    Texte de situation. `scale`, `position` et `opacity` valent None quand le node ne les précise pas.
+    """
+
+    __slots__ = ("text", "scale", "position", "opacity")
+    type = "write_text"
+
+    def __init__(self, text, scale=None, position=None, opacity=None):
+        self.text = text
+        self.scale = scale
+        self.position = position
+        self.opacity = opacity
+
+    @classmethod
+    def from_dict(cls, node):
+        return cls(node["text"], node.get("scale"), node.get("position"), node.get("opacity"))
+
+    def to_dict(self):
+        node = {"type": self.type, "text": self.text}
+        for key in ("scale", "position", "opacity"):
+            if getattr(self, key) is not None:
+                node[key] = getattr(self, key)
+        return node
+
+
+NODE_TYPES = {cls.type: cls for cls in (MoveNode, SaveStateNode, RestoreStateNode, WaitNode, WriteTextNode)}
+
+
+def node_from_dict(node):
+    """
+    Convertit un node au format dictionnaire en enregistrement.
+
+    Raises
+    ------
+    ValueError
+        Si le type du node ou d'une de ses actions est inconnu.
+    """
+    try:
+        cls = NODE_TYPES[node["type"]]
+    except KeyError:
+        raise ValueError(f"Type de node inconnu : {node.get('type')!r}") from None
+    return cls.from_dict(node)
+
+
+# ========== Play ==========
+
+class Play:
+    """
+    Une animation complète : placement initial, joueur avec la balle et séquence de nodes.
+
+    `players` et `defenders` sont des tableaux (5, 2) de points normalisés, avec des NaN
+    pour un joueur pas encore placé ou un défenseur absent.
+    """
+
+    __slots__ = ("scene_name", "players", "defenders", "ball_holder", "nodes")
+
+    def __init__(self, scene_name, players, defenders, ball_holder, nodes):
+        self.scene_name = scene_name
+        self.players = players
+        self.defenders = defenders
+        self.ball_holder = ball_holder
+        self.nodes = nodes
+
+    @classmethod
+    def from_dict(cls, animation_dict):
+        """
+        Construit une play depuis un dictionnaire d'animation, quelle que soit la version de son format.
+
+        Raises
+        ------
+        KeyError
+            S'il manque une clé au dictionnaire.
+        ValueError
+            Si une position, un type de node ou un type d'action est invalide.
+        """
+        return cls(
+            animation_dict["scene_name"],
+            _unit_points([animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)]),
+            _unit_points([animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]),
+            animation_dict["player_number_has_ball"],
+            [node_from_dict(node) for node in animation_dict["animation_sequence"]],
+        )
+
+    def to_dict(self):
+        """
+        Dictionnaire d'animation au format normalisé (FORMAT_VERSION).
+        """
+        animation_dict = {"format_version": FORMAT_VERSION}
+        for i, point in enumerate(_optional_points(self.players)):
+            animation_dict[f"joueur{i+1}_init_pos"] = point
+        for i, point in enumerate(_optional_points(self.defenders)):
+            animation_dict[f"defenseur{i+1}_init_pos"] = point
+        animation_dict["player_number_has_ball"] = self.ball_holder
+        animation_dict["scene_name"] = self.scene_name
+        animation_dict["animation_sequence"] = [node.to_dict() for node in self.nodes]
+        return animation_dict
+
+
+def upgrade_animation_dict(animation_dict):
+    """
+    Met un dictionnaire d'animation au format normalisé, par exemple à l'import d'un ancien fichier.
+
+    Raises
+    ------
+    KeyError
+        S'il manque une clé au dictionnaire.
+    ValueError
+        Si une position, un type de node ou un type d'action est invalide.
+    """
+    return Play.from_dict(animation_dict).to_dict()
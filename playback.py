@@ -0,0 +1,274 @@
+"""
+Aperçu instantané d'une animation, joué dans le navigateur sans rendu manim.
+
+`build_timeline` échantillonne la simulation de l'animation (voir `simulation`) en une
+timeline compacte d'images clés (positions des joueurs et de la balle, style de la balle,
+textes) ; `playback_html` renvoie un lecteur HTML/JavaScript qui la joue sur un canvas.
+"""
+import base64
+import io
+import json
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from assets import background_array
+from simulation import BALL_CREATE_TIME, Simulation, piece_positions
+
+
+PLAYBACK_FPS = 30  # Fréquence d'échantillonnage des trajectoires
+PRECISION = 3  # Nombre de décimales gardées dans la timeline
+
+
+class KeyframeTrack:
+    """
+    Suite d'images clés (t, valeurs) d'une entité, interpolées linéairement à la lecture.
+
+    Les valeurs identiques consécutives ne sont pas répétées : une image clé de
+    maintien est ajoutée juste avant le prochain changement.
+    """
+
+    __slots__ = ("keys",)
+
+    def __init__(self, t, value):
+        self.keys = [(t, self._round(value))]
+
+    @staticmethod
+    def _round(value):
+        return tuple(round(float(v), PRECISION) for v in value)
+
+    def set(self, t, value, dt=0.0):
+        """
+        Fixe la valeur à l'instant `t`, `dt` étant l'écart avec l'échantillon précédent
+        (0 pour un saut instantané).
+        """
+        value = self._round(value)
+        last_t, last_value = self.keys[-1]
+        if value == last_value:
+            return
+        hold_t = round(t - dt, PRECISION)
+        if hold_t > last_t:
+            self.keys.append((hold_t, last_value))
+        self.keys.append((round(t, PRECISION), value))
+
+    @property
+    def value(self):
+        return self.keys[-1][1]
+
+    def to_list(self):
+        """
+        Images clés sous la forme [t, *valeurs], sans celles que l'interpolation linéaire retrouve.
+        """
+        tolerance = 10 ** -PRECISION
+        keys = [self.keys[0]]
+        for k in range(1, len(self.keys) - 1):
+            (t0, v0), (t1, v1), (t2, v2) = keys[-1], self.keys[k], self.keys[k + 1]
+            if t2 > t0 and t1 > t0:
+                f = (t1 - t0) / (t2 - t0)
+                if all(abs(a + (c - a) * f - b) <= tolerance for a, b, c in zip(v0, v1, v2)):
+                    continue
+            keys.append((t1, v1))
+        if len(self.keys) > 1:
+            keys.append(self.keys[-1])
+        return [[t, *value] for t, value in keys]
+
+
+def _keyframes(timeline):
+    """
+    Images clés d'une trajectoire de la simulation, échantillonnée à PLAYBACK_FPS pendant les
+    animations, comme le ferait le rendu image par image.
+    """
+    track = KeyframeTrack(0.0, timeline.at(0.0))
+    dt = 1 / PLAYBACK_FPS
+    for start, end, piece in timeline.spans():
+        if piece[0] is None:
+            track.set(start, piece[2])  # Saut instantané, ou maintien à la fin d'une animation
+            continue
+        stop = piece[1] if end is None else min(piece[1], end)
+        times = np.append(np.arange(start, stop, dt), stop)
+        for t, position in zip(times, piece_positions(piece, times)):
+            track.set(t, position, dt)
+    return track.to_list()
+
+
+def build_timeline(animation_dict):
+    """
+    Construit la timeline d'images clés d'une animation.
+
+    Returns
+    -------
+    dict
+        {
+            "duration": durée totale en secondes,
+            "title": nom de la scène,
+            "players": images clés [t, x, y] de chaque attaquant,
+            "defenders": position [x, y] de chaque défenseur, ou None,
+            "ball": images clés [t, x, y] de la balle,
+            "ball_style": changements [t, échelle, couleur] de la balle,
+            "texts": changements [t, texte] du texte de situation,
+            "nodes": [début, durée, type] de chaque node,
+        }
+        Les positions sont dans l'espace manim.
+
+    Raises
+    ------
+    KeyError
+        Si un node restore_state fait référence à un état qui n'a pas été sauvegardé.
+    """
+    simulation = Simulation(animation_dict)
+    return {
+        "duration": round(simulation.duration, PRECISION),
+        "title": simulation.title,
+        "players": [_keyframes(timeline) for timeline in simulation.players],
+        "defenders": [
+            None if position is None else [round(float(v), PRECISION) for v in position]
+            for position in simulation.defenders
+        ],
+        "ball": _keyframes(simulation.ball),
+        "ball_style": [[round(t, PRECISION), scale, color] for t, (scale, color) in simulation.ball_style],
+        "texts": [[round(t, PRECISION), text] for t, text in simulation.texts],
+        "nodes": [
+            [round(start, PRECISION), round(end - start, PRECISION), node_type]
+            for start, end, node_type in zip(simulation.index.starts, simulation.index.ends, simulation.index.types)
+        ],
+    }
+
+
+@lru_cache(maxsize=2)
+def background_data_url(path, height):
+    """
+    Image du terrain encodée en JPEG dans une URL data:, pour le lecteur HTML.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(background_array(path, height)).convert("RGB").save(buffer, format="JPEG", quality=85)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def playback_html(timeline, background_url, start_time=0.0, autoplay=False):
+    """
+    Lecteur HTML/JavaScript de la timeline, à afficher avec `st.components.v1.html`.
+
+    Parameters
+    ----------
+    timeline : dict
+        La timeline produite par `build_timeline`.
+    background_url : str
+        L'URL de l'image du terrain (voir `background_data_url`).
+    start_time : float
+        L'instant affiché à l'ouverture du lecteur, en secondes.
+    autoplay : bool
+        Lancer la lecture dès l'ouverture du lecteur.
+    """
+    # La timeline (nom de la scène, textes) est insérée en dernier : un marqueur qu'elle
+    # contiendrait ne serait pas remplacé par les insertions suivantes
+    return (
+        _PLAYER_TEMPLATE
+        .replace("__BACKGROUND__", background_url)
+        .replace("__START__", json.dumps(float(start_time)))
+        .replace("__AUTOPLAY__", json.dumps(bool(autoplay)))
+        .replace("__TIMELINE__", json.dumps(timeline, ensure_ascii=False).replace("</", "<\\/"))
+    )
+
+
+# Le terrain occupe x ∈ [-6.2, 6.2] et y ∈ [-4, 4] dans l'espace manim (voir coordinates.clicks_to_manim)
+_PLAYER_TEMPLATE = """
+<div style="font-family: sans-serif;">
+  <canvas id="court" style="display: block; margin: auto; max-width: 100%; max-height: calc(100vh - 48px); border-radius: 4px;"></canvas>
+  <div style="display: flex; align-items: center; gap: 8px; margin-top: 6px;">
+    <button id="play">▶</button>
+    <input id="seek" type="range" min="0" step="0.01" style="flex: 1;">
+    <span id="clock" style="font-variant-numeric: tabular-nums; min-width: 7em; text-align: right;"></span>
+  </div>
+</div>
+<script>
+const TL = __TIMELINE__;
+const canvas = document.getElementById("court");
+const ctx = canvas.getContext("2d");
+const playButton = document.getElementById("play");
+const seek = document.getElementById("seek");
+const clock = document.getElementById("clock");
+const court = new Image();
+let t = Math.min(__START__, TL.duration), playing = false, last = null;
+seek.max = TL.duration;
+
+// Dernière image clé dont l'instant est <= t (recherche dichotomique)
+function lastKey(keys, t) {
+  let lo = 0, hi = keys.length - 1;
+  if (t < keys[0][0]) return 0;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (keys[mid][0] <= t) lo = mid; else hi = mid - 1;
+  }
+  return lo;
+}
+function position(keys, t) {
+  const k = lastKey(keys, t);
+  const a = keys[k], b = keys[k + 1];
+  if (!b || b[0] === a[0] || t <= a[0]) return [a[1], a[2]];
+  const f = (t - a[0]) / (b[0] - a[0]);
+  return [a[1] + (b[1] - a[1]) * f, a[2] + (b[2] - a[2]) * f];
+}
+const toPx = (x, y) => [(x + 6.2) / 12.4 * canvas.width, (4 - y) / 8 * canvas.height];
+
+function dot(x, y, color, label) {
+  const [px, py] = toPx(x, y), r = canvas.width / 12.4 * 0.2;
+  ctx.beginPath(); ctx.arc(px, py, r, 0, 2 * Math.PI);
+  ctx.fillStyle = color; ctx.fill();
+  ctx.lineWidth = 2; ctx.strokeStyle = "white"; ctx.stroke();
+  ctx.fillStyle = "white"; ctx.font = `bold ${Math.round(r * 1.1)}px sans-serif`;
+  ctx.textAlign = "center"; ctx.textBaseline = "middle"; ctx.fillText(label, px, py);
+}
+
+function draw() {
+  ctx.drawImage(court, 0, 0, canvas.width, canvas.height);
+  ctx.fillStyle = "white"; ctx.textAlign = "center"; ctx.textBaseline = "top";
+  ctx.font = `${Math.round(canvas.height / 30)}px sans-serif`;
+  ctx.fillText(TL.title, canvas.width / 2, canvas.height * 0.01);
+
+  TL.defenders.forEach((p, i) => { if (p) dot(p[0], p[1], "#FF0000", i + 1); });
+  TL.players.forEach((keys, i) => { const p = position(keys, t); dot(p[0], p[1], "#83C167", i + 1); });
+
+  const style = TL.ball_style[lastKey(TL.ball_style, t)];
+  const [bx, by] = toPx(...position(TL.ball, t));
+  const created = Math.min(1, t / __CREATE__);
+  ctx.beginPath();
+  ctx.arc(bx, by, canvas.width / 12.4 * 0.2 * style[1], 0, 2 * Math.PI * created);
+  ctx.lineWidth = 4; ctx.strokeStyle = style[2]; ctx.stroke();
+
+  const text = TL.texts[lastKey(TL.texts, t)][1];
+  if (text) {
+    ctx.globalAlpha = 0.5; ctx.fillStyle = "white"; ctx.textAlign = "left"; ctx.textBaseline = "bottom";
+    ctx.font = `${Math.round(canvas.height / 14)}px sans-serif`;
+    ctx.fillText(text, canvas.width * 0.02, canvas.height * 0.98);
+    ctx.globalAlpha = 1;
+  }
+  seek.value = t;
+  clock.textContent = `${t.toFixed(1)} / ${TL.duration.toFixed(1)} s`;
+}
+
+function frame(now) {
+  if (!playing) return;
+  if (last !== null) t = Math.min(TL.duration, t + (now - last) / 1000);
+  last = now;
+  draw();
+  if (t >= TL.duration) { playing = false; playButton.textContent = "▶"; return; }
+  requestAnimationFrame(frame);
+}
+function play() {
+  if (t >= TL.duration) t = 0;
+  playing = true; last = null; playButton.textContent = "⏸";
+  requestAnimationFrame(frame);
+}
+playButton.onclick = () => {
+  if (playing) { playing = false; playButton.textContent = "▶"; } else play();
+};
+seek.oninput = () => { t = parseFloat(seek.value); draw(); };
+court.onload = () => {
+  canvas.width = court.naturalWidth; canvas.height = court.naturalHeight;
+  draw();
+  if (__AUTOPLAY__) play();
+};
+court.src = "__BACKGROUND__";
+</script>
+""".replace("__CREATE__", str(BALL_CREATE_TIME))
@@ -0,0 +1,307 @@
+"""
+Archive de playbook (.playbook) : de nombreuses plays dans un seul fichier, avec un index.
+
+L'archive est un fichier zip :
+  - `index.json` : une entrée par play (identifiant, nom, nombre de nodes par type,
+    durée, tags et chemins de ses fichiers), lue seule pour parcourir l'archive ;
+  - `plays/<id>.bbp` : chaque play au format binaire (voir `playbook_format`), décodée
+    seulement quand on la demande ;
+  - `thumbnails/<id>.jpg` : un aperçu du placement initial ;
+  - `videos/<id>_<qualité>.mp4` : les vidéos déjà rendues, par qualité (par exemple "1080p60").
+
+Le répertoire central du zip donne un accès direct à chaque fichier : charger une play
+ne lit ni ne décode les autres.
+
+Usage
+-----
+>>> with PlaybookArchive("saison.playbook") as archive:
+...     for entry in archive.entries:
+...         print(entry["name"], entry["duration"])
+...     animation_dict = archive.load(archive.entries[0]["id"])
+
+En ligne de commande :
+    uv run python playbook_archive.py create saison.playbook plays/*.txt --tag "attaque placée" --videos final
+    uv run python playbook_archive.py list saison.playbook
+    uv run python playbook_archive.py extract saison.playbook <id> -o play.txt
+"""
+import argparse
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+from court_preview import render_placement
+from play_model import NUM_DEFENSEURS, NUM_JOUEURS, upgrade_animation_dict
+from playbook_format import EXTENSION as PLAYBOOK_EXTENSION, iter_plays, play_to_bytes
+from render_cache import content_hash
+from scene_state import animation_duration
+
+
+EXTENSION = ".playbook"
+INDEX_NAME = "index.json"
+ARCHIVE_VERSION = 1
+THUMBNAIL_HEIGHT = 240  # Hauteur des aperçus du placement initial, en pixels
+ENTRY_KEYS = ("id", "name", "nodes", "duration", "tags", "videos", "play")  # Clés de chaque entrée de l'index
+
+
+class PlaybookArchive:
+    """
+    Lecture d'une archive de playbook.
+
+    Parameters
+    ----------
+    file : str, Path or file-like
+        Le chemin de l'archive, ou un fichier ouvert en binaire (par exemple un fichier
+        envoyé avec `st.file_uploader`).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier n'est pas une archive de playbook valide.
+    """
+
+    def __init__(self, file):
+        try:
+            self._zip = zipfile.ZipFile(file)
+            index = json.loads(self._zip.read(INDEX_NAME))
+        except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+            raise ValueError(f"Archive de playbook invalide : {e}") from None
+        if not isinstance(index, dict) or not isinstance(index.get("plays"), list):
+            raise ValueError("Archive de playbook invalide : liste des plays absente de l'index")
+        for entry in index["plays"]:
+            missing = [key for key in ENTRY_KEYS if not isinstance(entry, dict) or key not in entry]
+            if missing:
+                raise ValueError(f"Archive de playbook invalide : entrée de play incomplète ({', '.join(missing)})")
+        if not isinstance(index.get("version", 0), int) or index.get("version", 0) > ARCHIVE_VERSION:
+            raise ValueError(f"Version {index['version']!r} de l'archive non prise en charge (maximum {ARCHIVE_VERSION})")
+        self.entries = index["plays"]
+        self._by_id = {entry["id"]: entry for entry in self.entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        self._zip.close()
+
+    def entry(self, play_id):
+        """
+        Entrée de l'index d'une play.
+
+        Raises
+        ------
+        KeyError
+            Si la play n'est pas dans l'archive.
+        """
+        return self._by_id[play_id]
+
+    def load(self, play_id):
+        """
+        Charge une seule play, sous forme de dictionnaire d'animation.
+        """
+        data = self._zip.read(self.entry(play_id)["play"])
+        play = next(iter_plays(io.BytesIO(data)), None)
+        if play is None:
+            raise ValueError(f"La play {play_id} est vide")
+        return play.to_dict()
+
+    def thumbnail(self, play_id):
+        """
+        Aperçu JPEG du placement initial d'une play, ou None si l'archive n'en contient pas.
+        """
+        path = self.entry(play_id).get("thumbnail")
+        return self._zip.read(path) if path else None
+
+    def video(self, play_id, quality):
+        """
+        Vidéo MP4 d'une play dans la qualité `quality` (par exemple "1080p60"), ou None.
+        """
+        path = self.entry(play_id).get("videos", {}).get(quality)
+        return self._zip.read(path) if path else None
+
+
+class PlaybookArchiveWriter:
+    """
+    Écriture d'une archive de playbook, play par play. L'index est écrit à la fermeture.
+
+    Parameters
+    ----------
+    path : str or Path
+        Le chemin de l'archive à créer.
+    background_path : str, optional
+        L'image du terrain utilisée pour les aperçus ; sans elle, pas d'aperçu.
+
+    Usage
+    -----
+    >>> with PlaybookArchiveWriter("saison.playbook", background_path=BACKGROUND_PATH) as writer:
+    ...     play_id = writer.add_play(animation_dict, tags=["attaque placée"])
+    ...     writer.add_video(play_id, "1080p60", "media/cache/renders/....mp4")
+    """
+
+    def __init__(self, path, background_path=None):
+        self.background_path = background_path
+        self._zip = zipfile.ZipFile(path, "w")
+        self._entries = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_play(self, animation_dict, tags=()):
+        """
+        Ajoute une play à l'archive.
+
+        L'identifiant est une empreinte du contenu : une play ajoutée deux fois n'est stockée qu'une fois.
+
+        Returns
+        -------
+        str
+            L'identifiant de la play dans l'archive.
+        """
+        animation_dict = upgrade_animation_dict(animation_dict)
+        play_id = content_hash(animation_dict)[:16]
+        if play_id in self._entries:
+            self._entries[play_id]["tags"] = sorted(set(self._entries[play_id]["tags"]) | set(tags))
+            return play_id
+
+        node_counts = {}
+        for node in animation_dict["animation_sequence"]:
+            node_counts[node["type"]] = node_counts.get(node["type"], 0) + 1
+        entry = {
+            "id": play_id,
+            "name": animation_dict["scene_name"],
+            "nodes": len(animation_dict["animation_sequence"]),
+            "node_counts": node_counts,
+            "duration": round(animation_duration(animation_dict), 3),
+            "tags": sorted(set(tags)),
+            "play": f"plays/{play_id}{PLAYBOOK_EXTENSION}",
+            "thumbnail": None,
+            "videos": {},
+        }
+        # La play binaire est déjà compacte : elle est stockée sans compression
+        self._zip.writestr(entry["play"], play_to_bytes(animation_dict))
+
+        if self.background_path is not None:
+            entry["thumbnail"] = f"thumbnails/{play_id}.jpg"
+            self._zip.writestr(
+                entry["thumbnail"],
+                render_placement(
+                    self.background_path,
+                    THUMBNAIL_HEIGHT,
+                    [animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)],
+                    [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)],
+                    animation_dict["player_number_has_ball"],
+                ),
+            )
+        self._entries[play_id] = entry
+        return play_id
+
+    def add_video(self, play_id, quality, video_file):
+        """
+        Ajoute la vidéo déjà rendue d'une play, pour la qualité `quality` (par exemple "1080p60").
+        """
+        path = f"videos/{play_id}_{quality}.mp4"
+        self._zip.write(video_file, path)
+        self._entries[play_id]["videos"][quality] = path
+
+    def close(self):
+        if self._zip.fp is None:
+            return
+        index = {"version": ARCHIVE_VERSION, "plays": list(self._entries.values())}
+        self._zip.writestr(
+            INDEX_NAME,
+            json.dumps(index, ensure_ascii=False, indent=1),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+        self._zip.close()
+
+
+# ========== Ligne de commande ==========
+
+def _iter_source_animations(paths):
+    for path in paths:
+        if path.suffix == PLAYBOOK_EXTENSION:
+            with open(path, "rb") as fp:
+                for play in iter_plays(fp):
+                    yield play.to_dict()
+        else:
+            yield json.loads(path.read_text(encoding="utf-8"))
+
+
+def _create(args):
+    # Le cache de rendu et l'image du terrain sont configurés dans helper (qui importe manim)
+    from helper import BACKGROUND_PATH, RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE, quality_tag
+    from render_cache import RenderCache, animation_cache_key
+
+    render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE)
+    qualities = [quality_tag(quality) for quality in args.videos]
+    with PlaybookArchiveWriter(args.output, background_path=BACKGROUND_PATH) as writer:
+        for animation_dict in _iter_source_animations(args.files):
+            animation_dict = upgrade_animation_dict(animation_dict)
+            play_id = writer.add_play(animation_dict, tags=args.tag)
+            for quality in qualities:
+                video_file = render_cache.get(animation_cache_key(animation_dict, quality=quality))
+                if video_file is not None:
+                    writer.add_video(play_id, quality, video_file)
+        count = len(writer)
+    print(f"{count} plays écrites dans {args.output}")
+
+
+def _list(args):
+    with PlaybookArchive(args.archive) as archive:
+        for entry in archive.entries:
+            tags = f" [{', '.join(entry['tags'])}]" if entry["tags"] else ""
+            videos = f" vidéos : {', '.join(entry['videos'])}" if entry["videos"] else ""
+            print(f"{entry['id']}  {entry['name']}  {entry['nodes']} nodes, {entry['duration']:.1f} s{tags}{videos}")
+
+
+def _extract(args):
+    with PlaybookArchive(args.archive) as archive:
+        animation_dict = archive.load(args.play_id)
+    args.output.write_text(json.dumps(animation_dict, indent=4, ensure_ascii=False), encoding="utf-8")
+    print(f"Play {args.play_id} écrite dans {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archives de playbook : plusieurs plays, leurs aperçus et leurs vidéos dans un seul fichier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Créer une archive à partir de fichiers .txt ou .bbp")
+    create.add_argument("output", type=Path, help="Archive à écrire")
+    create.add_argument("files", nargs="+", type=Path, help="Fichiers d'animation (.txt) ou playbooks binaires (.bbp)")
+    create.add_argument("--tag", action="append", default=[], help="Tag ajouté à toutes les plays (option répétable)")
+    create.add_argument(
+        "--videos", action="append", default=[], metavar="QUALITE",
+        help="Inclure les vidéos déjà présentes dans le cache de rendu pour cette qualité, par exemple final (option répétable)",
+    )
+    create.set_defaults(run=_create)
+    listing = commands.add_parser("list", help="Afficher l'index d'une archive")
+    listing.add_argument("archive", type=Path)
+    listing.set_defaults(run=_list)
+    extract = commands.add_parser("extract", help="Extraire une play en fichier .txt")
+    extract.add_argument("archive", type=Path)
+    extract.add_argument("play_id", help="Identifiant de la play (voir la commande list)")
+    extract.add_argument("-o", "--output", type=Path, required=True, help="Fichier .txt à écrire")
+    extract.set_defaults(run=_extract)
+
+    args = parser.parse_args(argv)
+    try:
+        args.run(args)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
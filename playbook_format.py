@@ -0,0 +1,396 @@
+"""
+Format binaire compact des playbooks (.bbp), en complément de l'export JSON (.txt).
+
+Un fichier .bbp contient une suite de plays, écrites et lues une par une : on peut
+convertir ou parcourir un playbook de milliers de plays sans le charger en entier.
+
+Structure (petit-boutiste) :
+  - en-tête : MAGIC, version du format (u16), 2 octets réservés ;
+  - puis pour chaque play : sa taille en octets (u32) suivie de la play encodée.
+
+Une play encodée contient le nom de la scène, le joueur avec la balle, les positions
+initiales et les nodes. Les positions sont des entiers int32 en millionièmes du terrain
+(`coordinates.UNIT_PRECISION` décimales), ce qui est exact pour des positions normalisées ;
+les actions d'un node d'actions sont des tableaux compacts (voir `play_model.MoveNode`).
+Les autres valeurs numériques gardent leur type (int ou float), si bien que
+JSON -> binaire -> JSON redonne exactement le dictionnaire normalisé de départ.
+
+Usage
+-----
+    uv run python playbook_format.py pack playbook.bbp plays/*.txt
+    uv run python playbook_format.py unpack playbook.bbp -o plays/
+"""
+import argparse
+import io
+import json
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from coordinates import UNIT_PRECISION
+from play_model import (
+    NUM_DEFENSEURS,
+    NUM_JOUEURS,
+    MoveNode,
+    Play,
+    RestoreStateNode,
+    SaveStateNode,
+    WaitNode,
+    WriteTextNode,
+)
+
+
+MAGIC = b"BBPB"
+VERSION = 1
+EXTENSION = ".bbp"
+UNIT_SCALE = 10 ** UNIT_PRECISION  # Positions stockées en millionièmes du terrain
+NODE_CODES = {cls.type: code for code, cls in enumerate((MoveNode, SaveStateNode, RestoreStateNode, WaitNode, WriteTextNode))}
+NODE_CLASSES = {code: node_type for node_type, code in NODE_CODES.items()}
+
+_HEADER = struct.Struct("<4sHH")
+_LENGTH = struct.Struct("<I")
+
+# Étiquettes des valeurs libres (durées, échelles, positions de texte...), pour garder leur type
+_NONE, _BOOL, _INT, _FLOAT, _STR, _LIST = range(6)
+
+
+# ========== Écriture ==========
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack("<" + fmt, *values))
+
+    def array(self, array, dtype):
+        self.parts.append(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+    def string(self, text):
+        data = text.encode("utf-8")
+        self.pack("I", len(data))
+        self.parts.append(data)
+
+    def value(self, value):
+        if value is None:
+            self.pack("B", _NONE)
+        elif isinstance(value, bool):
+            self.pack("B?", _BOOL, value)
+        elif isinstance(value, int):
+            self.pack("Bq", _INT, value)
+        elif isinstance(value, float):
+            self.pack("Bd", _FLOAT, value)
+        elif isinstance(value, str):
+            self.pack("B", _STR)
+            self.string(value)
+        elif isinstance(value, (list, tuple)):
+            self.pack("BI", _LIST, len(value))
+            for item in value:
+                self.value(item)
+        else:
+            raise ValueError(f"Valeur impossible à encoder : {value!r}")
+
+    def points(self, points):
+        """
+        Points normalisés (N, 2) sans NaN, en int32.
+        """
+        self.array(np.rint(points * UNIT_SCALE), np.int32)
+
+    def optional_points(self, points):
+        """
+        Points normalisés avec des NaN : un masque de présence (u8) puis les points présents.
+        """
+        present = ~np.isnan(points).any(axis=1)
+        self.pack("B", sum(1 << i for i, p in enumerate(present) if p))
+        self.points(points[present])
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+def _encode_node(writer, node):
+    writer.pack("B", NODE_CODES[node.type])
+    if isinstance(node, MoveNode):
+        writer.pack("HI", len(node), len(node.points))
+        writer.array(node.players, np.int8)
+        writer.array(node.kinds, np.uint8)
+        writer.array(node.targets, np.int8)
+        writer.array(node.run_times, np.float64)
+        writer.array(node.path_offsets, np.int32)
+        writer.points(node.points)
+        writer.pack("H", len(node.groups))
+        for key, indices in node.groups:
+            writer.string(key)
+            writer.pack("H", len(indices))
+            writer.array(indices, np.uint16)
+        writer.value(node.time_between)
+    elif isinstance(node, SaveStateNode):
+        writer.string(node.name)
+    elif isinstance(node, RestoreStateNode):
+        writer.string(node.name)
+        writer.string(node.new_text)
+    elif isinstance(node, WaitNode):
+        writer.value(node.duration)
+    elif isinstance(node, WriteTextNode):
+        writer.string(node.text)
+        writer.value(node.scale)
+        writer.value(node.position)
+        writer.value(node.opacity)
+
+
+def encode_play(play):
+    """
+    Encode une play (sans l'en-tête du fichier).
+
+    Returns
+    -------
+    bytes
+        La play encodée.
+    """
+    writer = _Writer()
+    writer.string(play.scene_name)
+    writer.pack("B", play.ball_holder)
+    writer.optional_points(play.players)
+    writer.optional_points(play.defenders)
+    writer.pack("I", len(play.nodes))
+    for node in play.nodes:
+        _encode_node(writer, node)
+    return writer.getvalue()
+
+
+def write_header(fp):
+    fp.write(_HEADER.pack(MAGIC, VERSION, 0))
+
+
+def write_play(fp, play):
+    """
+    Ajoute une play à un fichier dont l'en-tête a déjà été écrit.
+    """
+    data = encode_play(play)
+    fp.write(_LENGTH.pack(len(data)))
+    fp.write(data)
+
+
+def dump_plays(plays, fp):
+    """
+    Écrit un playbook complet. `plays` peut être un générateur : les plays sont encodées une par une.
+
+    Returns
+    -------
+    int
+        Le nombre de plays écrites.
+    """
+    write_header(fp)
+    count = 0
+    for play in plays:
+        write_play(fp, play)
+        count += 1
+    return count
+
+
+# ========== Lecture ==========
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def _take(self, size):
+        if self.offset + size > len(self.data):
+            raise ValueError("Play tronquée")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def unpack(self, fmt):
+        fmt = "<" + fmt
+        return struct.unpack(fmt, self._take(struct.calcsize(fmt)))
+
+    def array(self, count, dtype):
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._take(count * dtype.itemsize), dtype=dtype).copy()
+
+    def string(self):
+        size, = self.unpack("I")
+        return bytes(self._take(size)).decode("utf-8")
+
+    def value(self):
+        tag, = self.unpack("B")
+        if tag == _NONE:
+            return None
+        if tag == _BOOL:
+            return self.unpack("?")[0]
+        if tag == _INT:
+            return self.unpack("q")[0]
+        if tag == _FLOAT:
+            return self.unpack("d")[0]
+        if tag == _STR:
+            return self.string()
+        if tag == _LIST:
+            count, = self.unpack("I")
+            return [self.value() for _ in range(count)]
+        raise ValueError(f"Étiquette de valeur inconnue : {tag}")
+
+    def points(self, count):
+        return self.array(2 * count, np.int32).reshape(count, 2) / UNIT_SCALE
+
+    def optional_points(self, count):
+        mask, = self.unpack("B")
+        present = [bool(mask >> i & 1) for i in range(count)]
+        points = np.full((count, 2), np.nan)
+        points[present] = self.points(sum(present))
+        return points
+
+
+def _decode_node(reader):
+    code, = reader.unpack("B")
+    node_type = NODE_CLASSES.get(code)
+    if node_type == "move":
+        n_actions, n_points = reader.unpack("HI")
+        players = reader.array(n_actions, np.int8)
+        kinds = reader.array(n_actions, np.uint8)
+        targets = reader.array(n_actions, np.int8)
+        run_times = reader.array(n_actions, np.float64)
+        path_offsets = reader.array(n_actions + 1, np.int32)
+        points = reader.points(n_points)
+        groups = []
+        for _ in range(reader.unpack("H")[0]):
+            key = reader.string()
+            count, = reader.unpack("H")
+            groups.append((key, tuple(int(i) for i in reader.array(count, np.uint16))))
+        return MoveNode(players, kinds, targets, run_times, path_offsets, points, tuple(groups), reader.value())
+    if node_type == "save_state":
+        return SaveStateNode(reader.string())
+    if node_type == "restore_state":
+        return RestoreStateNode(reader.string(), reader.string())
+    if node_type == "wait":
+        return WaitNode(reader.value())
+    if node_type == "write_text":
+        return WriteTextNode(reader.string(), reader.value(), reader.value(), reader.value())
+    raise ValueError(f"Type de node inconnu : {code}")
+
+
+def decode_play(data):
+    """
+    Décode une play encodée par `encode_play`.
+
+    Raises
+    ------
+    ValueError
+        Si les données sont tronquées ou invalides.
+    """
+    reader = _Reader(data)
+    scene_name = reader.string()
+    ball_holder, = reader.unpack("B")
+    players = reader.optional_points(NUM_JOUEURS)
+    defenders = reader.optional_points(NUM_DEFENSEURS)
+    nodes = [_decode_node(reader) for _ in range(reader.unpack("I")[0])]
+    return Play(scene_name, players, defenders, ball_holder, nodes)
+
+
+def read_header(fp):
+    """
+    Lit et vérifie l'en-tête d'un playbook.
+
+    Raises
+    ------
+    ValueError
+        Si ce n'est pas un playbook binaire, ou si sa version n'est pas prise en charge.
+    """
+    header = fp.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("Fichier trop court pour être un playbook binaire")
+    magic, version, _ = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Ce fichier n'est pas un playbook binaire")
+    if version > VERSION:
+        raise ValueError(f"Version {version} du format binaire non prise en charge (maximum {VERSION})")
+    return version
+
+
+def iter_plays(fp):
+    """
+    Lit les plays d'un playbook une par une, sans charger tout le fichier.
+
+    Yields
+    ------
+    Play
+        Les plays, dans l'ordre du fichier.
+    """
+    read_header(fp)
+    while True:
+        prefix = fp.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise ValueError("Playbook tronqué")
+        size, = _LENGTH.unpack(prefix)
+        data = fp.read(size)
+        if len(data) < size:
+            raise ValueError("Playbook tronqué")
+        yield decode_play(data)
+
+
+def play_to_bytes(animation_dict):
+    """
+    Playbook binaire d'une seule play, à partir d'un dictionnaire d'animation (pour l'export).
+    """
+    buffer = io.BytesIO()
+    dump_plays([Play.from_dict(animation_dict)], buffer)
+    return buffer.getvalue()
+
+
+def load_plays(path):
+    """
+    Charge toutes les plays d'un playbook binaire, sous forme de dictionnaires d'animation.
+    """
+    with open(path, "rb") as fp:
+        return [play.to_dict() for play in iter_plays(fp)]
+
+
+# ========== Ligne de commande ==========
+
+def _pack(args):
+    def plays():
+        for path in args.files:
+            yield Play.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    with open(args.output, "wb") as fp:
+        count = dump_plays(plays(), fp)
+    print(f"{count} plays écrites dans {args.output}")
+
+
+def _unpack(args):
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with open(args.playbook, "rb") as fp:
+        for index, play in enumerate(iter_plays(fp)):
+            output_file = args.output_dir / f"{index + 1:05d}.txt"
+            output_file.write_text(json.dumps(play.to_dict(), indent=4, ensure_ascii=False), encoding="utf-8")
+    print(f"Plays écrites dans {args.output_dir}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conversion entre fichiers d'animation JSON (.txt) et playbooks binaires (.bbp).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Rassembler des fichiers .txt dans un playbook binaire")
+    pack.add_argument("output", type=Path, help="Playbook binaire à écrire")
+    pack.add_argument("files", nargs="+", type=Path, help="Fichiers d'animation .txt")
+    pack.set_defaults(run=_pack)
+    unpack = commands.add_parser("unpack", help="Extraire les plays d'un playbook binaire en fichiers .txt")
+    unpack.add_argument("playbook", type=Path, help="Playbook binaire à lire")
+    unpack.add_argument("-o", "--output-dir", type=Path, default=Path("."), help="Dossier de sortie")
+    unpack.set_defaults(run=_unpack)
+
+    args = parser.parse_args(argv)
+    try:
+        args.run(args)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Mesures d'un rendu : temps passé dans chaque phase et dans chaque node, nombre d'images,
+mémoire maximale du processus de rendu.
+
+Le profil en cours est global au processus, comme la configuration de manim : les
+fonctions du rendu mesurent leurs phases avec `phase(...)` sans avoir à se passer le
+profil, et ces mesures ne coûtent rien quand aucun profil n'est enregistré.
+
+Usage
+-----
+>>> with recording() as profile:
+...     with phase("plan"):
+...         segments = plan_segments(animation_dict)
+>>> write_metrics(profile, RENDER_METRICS_DIR, cache_key)
+"""
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure de la mémoire
+    resource = None
+
+
+PROMETHEUS_FILE = "render_metrics.prom"
+METRIC_PREFIX = "basketball_render"
+
+_current = None
+
+
+class RenderProfile:
+    """
+    Mesures d'un rendu.
+
+    `phases` associe à chaque phase {"seconds", "count"}, `nodes` contient une entrée par
+    segment rendu ({"segment", "kind", "type", "seconds", "frames"}).
+
+    `process_peak_memory` est le maximum atteint par le processus de rendu depuis son
+    démarrage, pas par ce seul rendu : un processus de rendu sert à de nombreux rendus, et
+    le système ne donne que ce maximum. Il ne baisse donc jamais d'un rendu à l'autre.
+    """
+
+    __slots__ = ("labels", "phases", "nodes", "frames", "process_peak_memory", "started", "seconds")
+
+    def __init__(self, **labels):
+        self.labels = labels
+        self.phases = {}
+        self.nodes = []
+        self.frames = 0
+        self.process_peak_memory = None
+        self.started = time.time()
+        self.seconds = None
+
+    def add_phase(self, name, seconds, count=1):
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "count": 0})
+        entry["seconds"] += seconds
+        entry["count"] += count
+
+    def add_node(self, segment, kind, node_type, seconds, frames):
+        self.nodes.append({"segment": segment, "kind": kind, "type": node_type, "seconds": seconds, "frames": frames})
+
+    def add_frames(self, count=1):
+        self.frames += count
+
+    def update_process_peak_memory(self):
+        """
+        Relève la mémoire maximale utilisée par ce processus et ses processus fils terminés, depuis leur démarrage.
+        """
+        peak = peak_memory()
+        if peak is not None:
+            self.process_peak_memory = max(self.process_peak_memory or 0, peak)
+
+    def merge(self, other):
+        """
+        Ajoute les mesures d'un autre profil, par exemple celui d'un processus de rendu des scénarios.
+
+        Parameters
+        ----------
+        other : dict
+            Un profil sous forme de dictionnaire (voir `to_dict`).
+        """
+        for name, entry in other["phases"].items():
+            self.add_phase(name, entry["seconds"], entry["count"])
+        self.nodes.extend(other["nodes"])
+        self.frames += other["frames"]
+        if other["process_peak_memory"] is not None:
+            self.process_peak_memory = max(self.process_peak_memory or 0, other["process_peak_memory"])
+
+    def to_dict(self):
+        return {
+            "labels": self.labels,
+            "started": self.started,
+            "seconds": self.seconds,
+            "frames": self.frames,
+            "process_peak_memory": self.process_peak_memory,
+            "phases": self.phases,
+            "nodes": sorted(self.nodes, key=lambda node: node["segment"]),
+        }
+
+
+def peak_memory():
+    """
+    Mémoire résidente maximale de ce processus et de ses fils terminés depuis leur démarrage
+    (et non depuis le début d'un rendu), en octets, ou None si inconnue.
+    """
+    if resource is None:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    return usage if os.uname().sysname == "Darwin" else usage * 1024
+
+
+def current():
+    """
+    Le profil enregistré dans ce processus, ou None.
+    """
+    return _current
+
+
+@contextmanager
+def recording(**labels):
+    """
+    Enregistre un profil pendant le bloc `with`, qui le reçoit. Les `labels` (qualité, clé
+    de cache...) sont recopiés dans les métriques.
+    """
+    global _current
+    previous, _current = _current, RenderProfile(**labels)
+    profile = _current
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.seconds = time.perf_counter() - start
+        profile.update_process_peak_memory()
+        _current = previous
+
+
+@contextmanager
+def phase(name):
+    """
+    Ajoute la durée du bloc `with` à la phase `name` du profil en cours, s'il y en a un.
+    """
+    if _current is None:
+        yield
+        return
+    profile = _current
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, time.perf_counter() - start)
+
+
+def timed(name, function):
+    """
+    Enveloppe `function` pour ajouter la durée de chacun de ses appels à la phase `name`.
+    """
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def count_frames(write_frame):
+    """
+    Enveloppe `SceneFileWriter.write_frame(frame, num_frames=1)` pour compter les images écrites.
+
+    Une pause (wait, fin de la vidéo) écrit la même image `num_frames` fois en un seul appel.
+    """
+    def counted(frame, num_frames=1, *args, **kwargs):
+        result = write_frame(frame, num_frames, *args, **kwargs)
+        if _current is not None:
+            _current.add_frames(num_frames)
+        return result
+
+    return counted
+
+
+# ========== Export ==========
+
+def _write_atomic(path, text):
+    tmp_file = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp_file.write_text(text, encoding="utf-8")
+    os.replace(tmp_file, path)
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(profile):
+    """
+    Métriques du profil au format texte de Prometheus (pour le collecteur textfile de node_exporter).
+
+    Parameters
+    ----------
+    profile : dict
+        Un profil sous forme de dictionnaire (voir `RenderProfile.to_dict`).
+    """
+    labels = {key: value for key, value in profile["labels"].items() if key != "cache_key"}
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+        for extra_labels, value in samples:
+            lines.append(f"{METRIC_PREFIX}_{name}{_prometheus_labels({**labels, **extra_labels})} {value}")
+
+    metric("duration_seconds", "gauge", "Durée du dernier rendu.", [({}, profile["seconds"])])
+    metric("frames", "gauge", "Images rendues par le dernier rendu.", [({}, profile["frames"])])
+    if profile["process_peak_memory"] is not None:
+        metric(
+            "process_peak_memory_bytes", "gauge",
+            "Mémoire résidente maximale du processus du dernier rendu depuis son démarrage (tous rendus confondus).",
+            [({}, profile["process_peak_memory"])],
+        )
+    metric(
+        "phase_seconds", "gauge", "Temps passé dans chaque phase du dernier rendu.",
+        [({"phase": name}, entry["seconds"]) for name, entry in sorted(profile["phases"].items())],
+    )
+    metric(
+        "segment_seconds", "gauge", "Temps de rendu de chaque segment (node) du dernier rendu.",
+        [({"segment": str(node["segment"]), "type": node["type"] or node["kind"]}, node["seconds"]) for node in profile["nodes"]],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(profile, metrics_dir, name, max_files=None):
+    """
+    Écrit le profil d'un rendu en JSON (`<name>.json`) et met à jour le fichier de métriques
+    Prometheus du dossier avec ce dernier rendu.
+
+    Parameters
+    ----------
+    profile : RenderProfile
+        Le profil du rendu.
+    metrics_dir : str or Path
+        Le dossier des métriques.
+    name : str
+        Le nom du fichier JSON, sans extension (par exemple la clé de cache du rendu).
+    max_files : int, optional
+        Nombre de profils JSON gardés dans le dossier ; les plus anciens sont supprimés.
+
+    Returns
+    -------
+    Path
+        Le chemin du fichier JSON.
+    """
+    metrics_dir = Path(metrics_dir)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    data = profile.to_dict()
+    json_file = metrics_dir / f"{name}.json"
+    _write_atomic(json_file, json.dumps(data, indent=1))
+    _write_atomic(metrics_dir / PROMETHEUS_FILE, prometheus_text(data))
+
+    if max_files is not None:
+        profiles = sorted(metrics_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for old_file in profiles[:max(0, len(profiles) - max_files)]:
+            old_file.unlink(missing_ok=True)
+    return json_file
+
+
+def load_metrics(metrics_dir, name):
+    """
+    Profil JSON d'un rendu (voir `write_metrics`), ou None s'il n'existe pas.
+    """
+    try:
+        return json.loads((Path(metrics_dir) / f"{name}.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
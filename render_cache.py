@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+
+def content_hash(content):
+    """
+    Empreinte SHA-256 canonique d'un contenu sérialisable en JSON.
+
+    Le contenu est sérialisé avec les clés triées, ce qui rend l'empreinte
+    indépendante de l'ordre d'insertion et du type de séquence (tuple ou liste).
+    """
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Version du rendu, dans toutes les clés de cache de vidéos : à incrémenter après tout
+# changement de l'apparence des vidéos (couleurs, pastilles, terrain, textes...), pour que
+# les vidéos et les segments rendus avec l'ancienne apparence ne soient plus réutilisés
+RENDER_VERSION = 1
+
+
+def animation_cache_key(animation_dict, quality, nodes=None):
+    """
+    Calcule une clé de cache canonique pour une animation (voir `content_hash`).
+
+    Parameters
+    ----------
+    animation_dict : dict
+        Le dictionnaire d'animation (positions initiales, joueur avec la balle,
+        nom de la scène et séquence d'animation).
+    quality : str
+        La qualité de rendu, par exemple "1080p60".
+    nodes : tuple, optional
+        La plage de nodes (début, fin) rendue, si la vidéo ne contient qu'une partie de la séquence.
+
+    Returns
+    -------
+    str
+        L'empreinte SHA-256 hexadécimale de l'animation.
+    """
+    inputs = {"animation": animation_dict, "quality": quality, "render_version": RENDER_VERSION}
+    if nodes is not None:
+        inputs["nodes"] = list(nodes)
+    return content_hash(inputs)
+
+
+def segment_cache_key(segment, quality):
+    """
+    Clé de cache de la vidéo d'un segment (voir `renderer.plan_segments`), pour une qualité
+    de rendu comme "1080p60".
+    """
+    return content_hash({"segment": segment, "quality": quality, "render_version": RENDER_VERSION})
+
+
+class RenderCache:
+    """
+    Cache disque des vidéos rendues, limité en taille avec une éviction LRU.
+
+    Chaque vidéo est stockée sous le nom `<clé>.mp4`. La date de modification du
+    fichier sert de date de dernier accès : elle est mise à jour à chaque lecture,
+    et les fichiers les plus anciens sont supprimés en premier lorsque la taille
+    totale dépasse `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key):
+        return self.directory / f"{key}.mp4"
+
+    def get(self, key):
+        """
+        Renvoie le chemin de la vidéo en cache, ou None si elle n'existe pas.
+        """
+        path = self.path_for(key)
+        try:
+            # On marque la vidéo comme récemment utilisée
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, video_file):
+        """
+        Copie une vidéo rendue dans le cache et renvoie son chemin dans le cache.
+        """
+        return self._store(key, lambda temp_path: shutil.copyfile(video_file, temp_path))
+
+    def put_bytes(self, key, data):
+        """
+        Comme `put`, pour une vidéo déjà en mémoire (par exemple lue dans une archive de playbook).
+        """
+        return self._store(key, lambda temp_path: temp_path.write_bytes(data))
+
+    def _store(self, key, write):
+        path = self.path_for(key)
+        # Écriture dans un fichier temporaire puis renommage atomique, pour qu'une
+        # autre session ne lise jamais une vidéo à moitié copiée
+        temp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        write(temp_path)
+        os.replace(temp_path, path)
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Supprime les vidéos les moins récemment utilisées jusqu'à repasser sous `max_bytes`.
+        """
+        entries = []
+        for path in self.directory.glob("*.mp4"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            if path.stem == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_size -= size
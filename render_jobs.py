@@ -0,0 +1,172 @@
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+RUNNING = "running"
+CANCELLED = "cancelled"
+
+
+def _started():
+    # Tâche vide : sa soumission suffit à démarrer un processus de rendu
+    return None
+
+
+class RenderQueueFull(Exception):
+    """
+    Levée quand la file de rendu a atteint sa taille maximale.
+    """
+
+
+class RenderCancelled(Exception):
+    """
+    Levée dans un processus de rendu à la place d'un rendu annulé pendant son attente.
+    """
+
+
+def _run_job(job_id, job_states, fn, args, kwargs):
+    """
+    Exécute un rendu dans un processus de rendu, sauf s'il a été annulé entre-temps.
+
+    Le pool considère une tâche comme commencée dès qu'elle entre dans sa file d'appels,
+    avant qu'un processus la prenne : le vrai début est enregistré ici. `setdefault` est
+    atomique dans le processus gestionnaire, un rendu ne peut donc pas être à la fois
+    annulé et commencé.
+    """
+    if job_states.setdefault(job_id, RUNNING) == CANCELLED:
+        raise RenderCancelled(f"Rendu annulé : {job_id}")
+    return fn(*args, **kwargs)
+
+
+class RenderJobManager:
+    """
+    File de rendus exécutés dans un pool de processus.
+
+    Manim n'est pas thread-safe (sa configuration est globale au processus), chaque
+    rendu est donc exécuté dans un processus séparé. Le nombre de rendus en attente
+    est borné : au-delà de `max_pending`, `submit` lève `RenderQueueFull`.
+
+    Les processus de rendu vivent aussi longtemps que la file : `initializer` est exécuté
+    une fois dans chacun à son démarrage (voir `render_worker.warm_up`), et `prestart`
+    les démarre sans attendre le premier rendu.
+
+    Usage
+    -----
+    >>> manager = RenderJobManager(max_workers=4, max_pending=8)
+    >>> job_id = manager.submit(render_to_cache, animation_dict, cache_key)
+    >>> manager.status(job_id)
+    'running'
+    >>> video_file = manager.result(job_id)
+    """
+
+    # Nombre de rendus terminés conservés pour que l'interface puisse récupérer leur résultat
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(self, max_workers, max_pending, initializer=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        # "spawn" plutôt que "fork" : le processus Streamlit est multi-thread
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=initializer,
+        )
+        # État réel de chaque rendu, partagé avec les processus de rendu (voir `_run_job`) :
+        # absent tant que le rendu attend, RUNNING une fois commencé, ou CANCELLED
+        self._state_manager = context.Manager()
+        self._job_states = self._state_manager.dict()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Ajoute un rendu à la file et renvoie son identifiant.
+
+        `fn` doit être une fonction importable depuis un module (et non depuis le
+        script Streamlit), pour pouvoir être exécutée dans un processus de rendu.
+        """
+        with self._lock:
+            pending = self._pending_count()
+            if pending >= self.max_workers + self.max_pending:
+                raise RenderQueueFull(
+                    f"La file de rendu est pleine ({pending} rendus en cours ou en attente)."
+                )
+            self._prune()
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = self._executor.submit(_run_job, job_id, self._job_states, fn, args, kwargs)
+        return job_id
+
+    def prestart(self):
+        """
+        Démarre tous les processus de rendu, qui se préparent pendant que l'utilisateur
+        construit son animation.
+
+        Le pool ne démarre un processus qu'à la soumission d'une tâche : on soumet une tâche
+        vide par processus, sans l'enregistrer comme rendu.
+        """
+        for _ in range(self.max_workers):
+            self._executor.submit(_started)
+
+    def pending_count(self):
+        """
+        Nombre de rendus en cours ou en attente.
+        """
+        with self._lock:
+            return self._pending_count()
+
+    def _pending_count(self):
+        return sum(1 for future in self._jobs.values() if not future.done())
+
+    def status(self, job_id):
+        """
+        Renvoie l'état d'un rendu : "queued", "running", "done", "failed" ou "cancelled".
+        """
+        future = self._get(job_id)
+        if future.cancelled():
+            return "cancelled"
+        if future.done():
+            if isinstance(future.exception(), RenderCancelled):
+                return "cancelled"
+            return "failed" if future.exception() is not None else "done"
+        state = self._job_states.get(job_id)
+        if state == CANCELLED:
+            return "cancelled"
+        return "running" if state == RUNNING else "queued"
+
+    def result(self, job_id, timeout=None):
+        """
+        Renvoie le résultat d'un rendu, en attendant au plus `timeout` secondes.
+
+        L'exception levée par le rendu, le cas échéant, est propagée.
+        """
+        return self._get(job_id).result(timeout=timeout)
+
+    def cancel(self, job_id):
+        """
+        Annule un rendu encore en attente. Renvoie False si le rendu a déjà commencé.
+        """
+        if self._get(job_id).cancel():
+            return True
+        # Déjà dans la file d'appels du pool : le processus qui le prendra ne le lancera pas
+        return self._job_states.setdefault(job_id, CANCELLED) == CANCELLED
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._state_manager.shutdown()
+
+    def _get(self, job_id):
+        with self._lock:
+            try:
+                return self._jobs[job_id]
+            except KeyError:
+                raise KeyError(f"Rendu inconnu : {job_id}") from None
+
+    def _prune(self):
+        # On oublie les rendus terminés les plus anciens
+        finished = [job_id for job_id, future in self._jobs.items() if future.done()]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+            self._job_states.pop(job_id, None)
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+def new_job_dir(base_dir, tag=None):
+    """
+    Crée un dossier de sortie isolé et unique pour un rendu.
+
+    Le nom du dossier commence par la date de création pour rester lisible,
+    suivie d'un identifiant aléatoire pour éviter toute collision entre deux
+    rendus lancés au même moment par des sessions différentes.
+
+    Parameters
+    ----------
+    base_dir : str or Path
+        Le dossier parent de tous les dossiers de rendu.
+    tag : str, optional
+        Un suffixe ajouté au nom du dossier, par exemple la qualité de rendu.
+
+    Returns
+    -------
+    Path
+        Le chemin du dossier créé.
+    """
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}"
+    if tag:
+        name = f"{name}-{tag}"
+    job_dir = Path(base_dir) / name
+    job_dir.mkdir(parents=True, exist_ok=False)
+    return job_dir
+
+
+def remove_job_dir(job_dir):
+    """
+    Supprime un dossier de rendu et tout son contenu.
+    """
+    shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def _last_activity(job_dir):
+    """
+    Date de la dernière modification dans un dossier de rendu, sous-dossiers compris.
+
+    La date du dossier lui-même ne change qu'à l'ajout d'un fichier directement dedans :
+    un rendu long, qui n'écrit que dans des sous-dossiers, paraîtrait abandonné.
+    """
+    latest = job_dir.stat().st_mtime
+    for root, dirs, files in os.walk(job_dir):
+        for name in dirs + files:
+            try:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+            except FileNotFoundError:
+                continue
+    return latest
+
+
+def cleanup_old_jobs(base_dir, max_age):
+    """
+    Supprime les dossiers de rendu sans activité depuis plus de `max_age` secondes.
+
+    Cela couvre les rendus interrompus ou en erreur, dont le dossier n'a pas été
+    supprimé à la fin du rendu. Un rendu encore en cours écrit régulièrement dans son
+    dossier (voir `_last_activity`) et n'est pas supprimé.
+
+    Parameters
+    ----------
+    base_dir : str or Path
+        Le dossier parent de tous les dossiers de rendu.
+    max_age : float
+        L'âge maximal d'un dossier de rendu, en secondes.
+
+    Returns
+    -------
+    int
+        Le nombre de dossiers supprimés.
+    """
+    base_dir = Path(base_dir)
+    if not base_dir.is_dir():
+        return 0
+
+    limit = time.time() - max_age
+    removed = 0
+    for job_dir in base_dir.iterdir():
+        try:
+            if not job_dir.is_dir() or _last_activity(job_dir) > limit:
+                continue
+        except FileNotFoundError:
+            continue
+        remove_job_dir(job_dir)
+        removed += 1
+    return removed
+
+
+# ========== Segments publiés pendant un rendu ==========
+
+STREAM_MANIFEST = "manifest.json"
+
+
+def start_stream(stream_dir, num_segments):
+    """
+    Annonce le nombre de segments d'un rendu, avant de publier ses segments dans `stream_dir`.
+    """
+    stream_dir = Path(stream_dir)
+    tmp_file = stream_dir / f".{STREAM_MANIFEST}.{uuid.uuid4().hex}"
+    tmp_file.write_text(json.dumps({"segments": num_segments}), encoding="utf-8")
+    os.replace(tmp_file, stream_dir / STREAM_MANIFEST)
+
+
+def publish_segment(stream_dir, index, video_file):
+    """
+    Publie la vidéo d'un segment terminé, pour qu'elle puisse être lue avant la fin du rendu.
+
+    La vidéo est copiée sous un nom temporaire puis renommée : un lecteur ne voit jamais un
+    segment à moitié écrit. Plusieurs processus peuvent publier dans le même dossier.
+    """
+    stream_dir = Path(stream_dir)
+    tmp_file = stream_dir / f".segment_{index:04d}.{uuid.uuid4().hex}.mp4"
+    try:
+        # Un lien suffit quand le cache et le dossier sont sur le même disque
+        os.link(video_file, tmp_file)
+    except OSError:
+        shutil.copyfile(video_file, tmp_file)
+    os.replace(tmp_file, stream_dir / f"segment_{index:04d}.mp4")
+
+
+def ready_segments(stream_dir):
+    """
+    Segments déjà publiés d'un rendu en cours, à partir du premier et sans trou.
+
+    Returns
+    -------
+    tuple
+        (chemins des segments lisibles dans l'ordre, nombre total de segments ou None s'il n'est pas encore connu)
+    """
+    stream_dir = Path(stream_dir)
+    try:
+        total = json.loads((stream_dir / STREAM_MANIFEST).read_text(encoding="utf-8"))["segments"]
+    except (FileNotFoundError, json.JSONDecodeError):
+        return [], None
+    ready = []
+    for index in range(total):
+        video_file = stream_dir / f"segment_{index:04d}.mp4"
+        if not video_file.exists():
+            break
+        ready.append(video_file)
+    return ready, total
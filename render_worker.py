@@ -0,0 +1,41 @@
+"""
+Préparation des processus de rendu, exécutée une fois au démarrage de chacun.
+
+Un processus de rendu vit aussi longtemps que la file de rendus (voir `RenderJobManager`) :
+tout ce qui est préparé ici sert à tous ses rendus. Le premier rendu ne paie donc ni
+l'import de manim, ni le décodage de l'image du terrain, ni la construction des numéros
+des joueurs (Tex).
+
+Usage
+-----
+>>> manager = RenderJobManager(max_workers=4, max_pending=8, initializer=warm_up)
+>>> manager.prestart()
+"""
+from assets import background_array, manim_background_height
+from helper import BACKGROUND_PATH, BACKGROUND_SCALE, RENDER_QUALITIES, warm_player_labels
+import renderer  # Importe manim et le code du rendu dans le processus
+
+
+def warm_up(qualities=None):
+    """
+    Prépare le processus de rendu : image du terrain à la résolution de chaque qualité et
+    numéros des joueurs.
+
+    La préparation est faite au mieux : une exception dans l'initialisation d'un processus
+    casserait tout le pool (BrokenProcessPool pour tous les rendus). En cas d'échec, le
+    premier rendu est seulement plus lent, et lèvera la même erreur avec son contexte.
+
+    Parameters
+    ----------
+    qualities : list, optional
+        Les qualités de rendu à préparer (clés de RENDER_QUALITIES). Par défaut, toutes.
+    """
+    for quality in qualities or RENDER_QUALITIES:
+        try:
+            background_array(BACKGROUND_PATH, manim_background_height(RENDER_QUALITIES[quality]["pixel_height"], BACKGROUND_SCALE))
+        except Exception:
+            pass
+    try:
+        warm_player_labels()
+    except Exception:
+        pass
@@ -0,0 +1,587 @@
+from manim import *
+from helper import *
+from pathlib import Path
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+import av
+from assets import background_array, manim_background_height, manim_scale_to_resolution
+from coordinates import clicks_to_manim, optional_clicks_to_manim
+from render_cache import RenderCache, segment_cache_key
+from profiling import count_frames, current as current_profile, phase, recording, timed, write_metrics
+from render_output import new_job_dir, publish_segment, remove_job_dir, cleanup_old_jobs, start_stream
+from scene_state import initial_state, sequence_states
+
+
+def make_ball(ball_state):
+    """
+    Crée la balle (une couronne) dans l'état décrit par `ball_state` (voir scene_state).
+    """
+    return (
+        Circle(radius=0.2, color=ORANGE)
+        .move_to(ball_state["position"])
+        .scale(ball_state["scale"])
+        .set_color(ManimColor(ball_state["color"]))
+    )
+
+
+def make_situation_text(text_state):
+    """
+    Crée le texte de situation affiché en bas à gauche, décrit par `text_state` (voir scene_state).
+    """
+    with phase("text"):
+        return (
+            text_mobject(text_state["text"])
+            .scale(text_state["scale"])
+            .to_edge(np.array(text_state["position"], dtype=float))
+            .set_opacity(text_state["opacity"])
+        )
+
+
+class Systeme_basketball(MovingCameraScene):
+    def __init__(self, animation_dict, steps=None, state=None, intro=True, outro=True, **kwargs):
+        """
+        Scène manim d'un système de jeu, construite à partir d'un dictionnaire d'animation
+        (le même format que celui de l'export en txt).
+
+        Parameters
+        ----------
+        animation_dict : dict
+            Le dictionnaire d'animation.
+        steps : list, optional
+            Les nodes à jouer. Par défaut, toute la séquence d'animation.
+        state : dict, optional
+            L'état de la scène avant le premier node (voir scene_state). Par défaut, l'état initial.
+        intro : bool
+            Faire apparaître la balle au début de la scène.
+        outro : bool
+            Ajouter la pause finale.
+        """
+        super().__init__(**kwargs)
+        if state is None:
+            state = initial_state(animation_dict)
+        self.scene_name = animation_dict["scene_name"]
+        self.animation_sequence = animation_dict["animation_sequence"] if steps is None else steps
+        self.intro = intro
+        self.outro = outro
+
+        # Les pastilles des joueurs sont copiées depuis celles préconstruites pour le processus
+        with phase("labels"):
+            self.players = [
+                Player(i + 1, tuple(state["players"][i]), state["has_ball"][i])
+                for i in range(NUM_JOUEURS)
+            ]
+            self.joueur1, self.joueur2, self.joueur3, self.joueur4, self.joueur5 = self.players
+
+            defender_positions = optional_clicks_to_manim(
+                [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]
+            )
+            self.defenders = [
+                Player(i + 1, position, False, defenseur=True) if position is not None else None
+                for i, position in enumerate(defender_positions)
+            ]
+        self.defenseur1, self.defenseur2, self.defenseur3, self.defenseur4, self.defenseur5 = self.defenders
+
+        # La balle est une courronne de couleur orange
+        self.ball = make_ball(state["ball"])
+
+        # Pour sauvegarder l'état des joueurs et de la balle à différents moments
+        self.animation_states = {
+            name: {
+                "players": {
+                    f"joueur{i+1}": {
+                        "position": tuple(saved["players"][i]),
+                        "has_ball": saved["has_ball"][i],
+                        "defenseur": False,
+                    }
+                    for i in range(NUM_JOUEURS)
+                },
+                "ball": make_ball(saved["ball"]),
+            }
+            for name, saved in state["saved_states"].items()
+        }
+
+        # Text object to store the text of the current situation
+        self.GLOBAL_SITUATION_TEXT = make_situation_text(state["text"])
+
+    def save_state(self, name):
+        current_state = {
+            "players": {
+                f"joueur{i+1}": player.custom_save_state()
+                for i, player in enumerate(self.players)
+            },
+            # Une copie par état : Mobject.save_state() ne garde que le dernier état sauvegardé
+            "ball": self.ball.copy(),
+        }
+        self.animation_states[name] = current_state
+
+    def restore_state(self, name, new_text):
+        self.wait(2)
+        state = self.animation_states[name]
+        for key, saved_state in state["players"].items():
+            player_number = int(key[-1])
+            player = self.players[player_number - 1]
+            player.custom_restore_state(saved_state)
+        self.ball.saved_state = state["ball"].copy()
+        ball_restore_animation = Restore(self.ball, run_time=0.1)
+
+        # Update the text
+        with phase("text"):
+            new_text_mobject = (
+                text_mobject(new_text).scale(1.5).to_edge(DOWN + LEFT).set_opacity(0.5)
+            )
+
+        self.play(
+            ball_restore_animation,
+            Transform(
+                self.GLOBAL_SITUATION_TEXT,
+                new_text_mobject,
+            ),
+        )
+        self.wait(2)
+
+    def add_node(self, moves, time_arrangement, time_between):
+        animations = []
+        with phase("paths"):
+            for value in moves:
+                player_number = int(value[0])
+                player = self.players[player_number - 1]
+                method_name = value[-1]
+                run_time = value[-2]
+                args = value[1:-2]
+
+                if method_name == "pass_ball":
+                    target_player_number = args[0]
+                    target_player = self.players[target_player_number - 1]
+                    method = getattr(player, method_name)
+                    animations.append(
+                        method(self.ball, target_player, run_time=run_time)
+                    )
+                elif method_name == "move":
+                    # Toutes les positions du déplacement sont converties en un seul appel
+                    positions = clicks_to_manim(args)
+                    method = getattr(player, method_name)
+                    animations.append(method(self.ball, *positions, run_time=run_time))
+                elif method_name == "shoot_ball":
+                    method = getattr(player, method_name)
+                    animations.append(method(self.ball, run_time=run_time))
+
+        animation_groups = []
+        for _, indices in time_arrangement.items():
+            group = AnimationGroup(*[animations[i] for i in indices])
+            animation_groups.append(group)
+        self.play(LaggedStart(*animation_groups, lag_ratio=time_between))
+
+    def construct(self):
+        # ============================================================
+        # ==================== SCENE INIT ============================
+        # ============================================================
+
+        # Add the image as background, pré-redimensionnée à la résolution de la vidéo
+        with phase("background"):
+            background_height = manim_background_height(config.pixel_height, BACKGROUND_SCALE)
+            background = ImageMobject(
+                background_array(BACKGROUND_PATH, background_height),
+                scale_to_resolution=manim_scale_to_resolution(background_height),
+            ).scale(BACKGROUND_SCALE)
+        self.add(background)
+
+        # Write "Système 0" in the top middle of the screen
+        with phase("text"):
+            title = text_mobject(self.scene_name).scale(0.5).move_to(UP * 3.75)
+        self.add(title)
+
+        # Display all players
+        self.add(
+            *[player.manim_object for player in self.players],
+        )
+
+        # Display defenseurs if they are not None
+        for defenseur in self.defenders:
+            if defenseur is not None:
+                self.add(defenseur.manim_object)
+
+        if self.intro:
+            # Display the ball
+            self.play(Create(self.ball))
+
+            self.wait(1)
+        else:
+            self.add(self.ball)
+
+        self.add(self.GLOBAL_SITUATION_TEXT)
+
+        # ============================================================
+        # ==================== SCENE ANIMATIONS =======================
+        # ============================================================
+
+        for step in self.animation_sequence:
+            action_type = step["type"]
+            if action_type == "move":
+                self.add_node(
+                    moves=step["moves"],
+                    time_arrangement=step["time_arrangement"],
+                    time_between=step["time_between"],
+                )
+            elif action_type == "save_state":
+                self.save_state(name=step["name"])
+            elif action_type == "restore_state":
+                self.restore_state(
+                    name=step["name"],
+                    new_text=step["new_text"],
+                )
+            elif action_type == "wait":
+                self.wait(step["duration"])
+            elif action_type == "write_text":
+                with phase("text"):
+                    new_text_mobject = (
+                        text_mobject(step["text"])
+                        .scale(step.get("scale", 1.5))
+                        .to_edge(step.get("position", DOWN + LEFT))
+                        .set_opacity(step.get("opacity", 0.5))
+                    )
+                self.play(Transform(self.GLOBAL_SITUATION_TEXT, new_text_mobject))
+
+        if self.outro:
+            self.wait(1)
+
+
+def check_node_range(animation_dict, nodes):
+    """
+    Vérifie une plage de nodes (début, fin), fin exclue, et la renvoie sous forme de tuple.
+
+    Raises
+    ------
+    ValueError
+        Si la plage est vide ou sort de la séquence d'animation.
+    """
+    start, stop = nodes
+    num_nodes = len(animation_dict["animation_sequence"])
+    if not 0 <= start < stop <= num_nodes:
+        raise ValueError(f"Plage de nodes invalide : {start + 1} à {stop} (la séquence contient {num_nodes} nodes)")
+    return start, stop
+
+
+def plan_segments(animation_dict, nodes=None):
+    """
+    Découpe une animation en segments rendus et mis en cache indépendamment.
+
+    Un segment correspond à l'apparition de la balle, à un node, ou à la pause finale.
+    Il contient tout ce qui détermine ses images : le node, l'état de la scène à son
+    entrée (seul l'état restauré est conservé pour un node restore_state) et le décor
+    (nom de la scène et défenseurs). Les nodes save_state ne produisent pas d'image et
+    ne donnent donc pas de segment.
+
+    Parameters
+    ----------
+    animation_dict : dict
+        Le dictionnaire d'animation.
+    nodes : tuple, optional
+        Ne garder que les nodes de la plage (début, fin), fin exclue. L'état de la scène est
+        calculé sans rendu jusqu'au premier node ; l'apparition de la balle n'est gardée que
+        si la plage commence au premier node, la pause finale que si elle finit au dernier.
+
+    Returns
+    -------
+    list
+        Liste de segments, dans l'ordre de la vidéo.
+    """
+    num_nodes = len(animation_dict["animation_sequence"])
+    start, stop = (0, num_nodes) if nodes is None else check_node_range(animation_dict, nodes)
+    states = sequence_states(animation_dict)
+    decor = {
+        "scene_name": animation_dict["scene_name"],
+        "defenders": [
+            animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)
+        ],
+    }
+
+    def entering_state(index, restored_name=None):
+        state = dict(states[index])
+        saved_states = state.pop("saved_states")
+        if restored_name is not None:
+            state["saved_states"] = {restored_name: saved_states[restored_name]}
+        else:
+            state["saved_states"] = {}
+        return state
+
+    segments = []
+    if start == 0:
+        segments.append({"kind": "intro", "node": None, "state": entering_state(0), "decor": decor})
+    for index in range(start, stop):
+        node = animation_dict["animation_sequence"][index]
+        if node["type"] == "save_state":
+            continue
+        restored_name = node["name"] if node["type"] == "restore_state" else None
+        segments.append({
+            "kind": "node",
+            "node": node,
+            "state": entering_state(index, restored_name),
+            "decor": decor,
+        })
+    if stop == num_nodes:
+        segments.append({"kind": "outro", "node": None, "state": entering_state(-1), "decor": decor})
+    return segments
+
+
+def render_segment(animation_dict, segment, output_dir, name, quality=DEFAULT_RENDER_QUALITY):
+    """
+    Rend un seul segment (voir `plan_segments`) dans `output_dir` et renvoie le chemin de la vidéo.
+    """
+    settings = RENDER_QUALITIES[quality]
+    with tempconfig({
+        "pixel_width": settings["pixel_width"],
+        "pixel_height": settings["pixel_height"],
+        "frame_rate": settings["frame_rate"],
+        "media_dir": str(output_dir),
+        "video_dir": "{media_dir}/videos",
+        "tex_dir": TEX_DIR,
+        "text_dir": TEXT_DIR,
+        "output_file": name,
+        # Le cache de manim ne survit pas aux dossiers de rendu isolés : le cache de segments le remplace
+        "disable_caching": True,
+    }):
+        scene = Systeme_basketball(
+            animation_dict,
+            steps=[segment["node"]] if segment["node"] is not None else [],
+            state=segment["state"],
+            intro=segment["kind"] == "intro",
+            outro=segment["kind"] == "outro",
+        )
+        if current_profile() is not None:
+            # Images comptées au niveau de l'écrivain de fichiers de manim. write_frame ne fait que
+            # mettre l'image en file : l'encodage est fait par encode_and_write_frame, dans le
+            # thread d'écriture, en parallèle de play
+            file_writer = scene.renderer.file_writer
+            file_writer.write_frame = count_frames(file_writer.write_frame)
+            file_writer.encode_and_write_frame = timed("encode", file_writer.encode_and_write_frame)
+            file_writer.finish = timed("finish", file_writer.finish)
+            scene.play = timed("play", scene.play)
+        scene.render()
+        return Path(scene.renderer.file_writer.movie_file_path)
+
+
+def concat_videos(video_files, output_file):
+    """
+    Concatène des vidéos de même format en une seule, sans les réencoder.
+
+    Même méthode que manim pour assembler ses fichiers partiels (démultiplexeur concat de FFmpeg).
+    """
+    output_file = Path(output_file)
+    file_list = output_file.with_suffix(".txt")
+    with file_list.open("w", encoding="utf-8") as fp:
+        for video_file in video_files:
+            fp.write(f"file 'file:{Path(video_file).resolve().as_posix()}'\n")
+
+    input_container = av.open(str(file_list), options={"safe": "0", "an": "1"}, format="concat")
+    input_stream = input_container.streams.video[0]
+    output_container = av.open(str(output_file), mode="w")
+    output_stream = output_container.add_stream(codec_name=None, template=input_stream)
+    for packet in input_container.demux(input_stream):
+        # On ignore les paquets de vidage générés par demux
+        if packet.dts is None:
+            continue
+        # Les dts des fichiers successifs ne sont pas croissants : on laisse libav les recalculer
+        packet.dts = None
+        packet.stream = output_stream
+        output_container.mux(packet)
+    input_container.close()
+    output_container.close()
+    file_list.unlink()
+    return output_file
+
+
+def split_scenarios(segments):
+    """
+    Regroupe des segments par scénario : un nouveau scénario commence à chaque node restore_state.
+
+    L'état d'entrée de chaque segment est connu sans rendu (voir `plan_segments`) : les
+    scénarios peuvent donc être rendus indépendamment les uns des autres.
+
+    Parameters
+    ----------
+    segments : list
+        Les segments (indice, segment) dans l'ordre de la vidéo.
+
+    Returns
+    -------
+    list
+        Les listes de segments (indice, segment) de chaque scénario, dans l'ordre de la vidéo.
+    """
+    scenarios = [[]]
+    for index, segment in segments:
+        if segment["node"] is not None and segment["node"]["type"] == "restore_state" and scenarios[-1]:
+            scenarios.append([])
+        scenarios[-1].append((index, segment))
+    return scenarios
+
+
+def render_segments(animation_dict, segments, output_dir, quality=DEFAULT_RENDER_QUALITY, stream_dir=None):
+    """
+    Rend des segments (indice, segment) les uns après les autres, en réutilisant ceux déjà
+    présents dans le cache de segments, et renvoie les chemins de leurs vidéos.
+
+    C'est la tâche exécutée pour chaque scénario par les processus de `create_manim_animation`.
+    Avec `stream_dir`, chaque segment est publié dès qu'il est prêt (voir `publish_segment`).
+    """
+    segment_cache = RenderCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_SIZE)
+    tag = quality_tag(quality)
+    profile = current_profile()
+    segment_files = []
+    for index, segment in segments:
+        cache_key = segment_cache_key(segment, tag)
+        video_file = segment_cache.get(cache_key)
+        if video_file is None:
+            start, frames = time.perf_counter(), profile.frames if profile is not None else 0
+            video_file = render_segment(animation_dict, segment, output_dir, f"segment_{index}_{tag}", quality)
+            if profile is not None:
+                node_type = segment["node"]["type"] if segment["node"] is not None else None
+                profile.add_node(index, segment["kind"], node_type, time.perf_counter() - start, profile.frames - frames)
+            video_file = segment_cache.put(cache_key, video_file)
+        if stream_dir is not None:
+            publish_segment(stream_dir, index, video_file)
+        segment_files.append(video_file)
+    return segment_files
+
+
+def render_scenario(animation_dict, segments, output_dir, quality=DEFAULT_RENDER_QUALITY, stream_dir=None):
+    """
+    `render_segments` exécutée dans un processus de rendu des scénarios, avec ses mesures.
+
+    Returns
+    -------
+    tuple
+        (chemins des vidéos des segments, profil du processus sous forme de dictionnaire)
+    """
+    with recording() as profile:
+        with phase("labels"):
+            warm_player_labels()
+        segment_files = render_segments(animation_dict, segments, output_dir, quality, stream_dir)
+    return segment_files, profile.to_dict()
+
+
+def create_manim_animation(animation_dict, output_dir, quality=DEFAULT_RENDER_QUALITY, nodes=None, workers=1, stream_dir=None):
+    """
+    Fonction qui crée une animation manim à partir d'un dictionnaire d'animation
+
+    L'animation est rendue segment par segment (voir `plan_segments`). Chaque segment
+    est mis en cache selon son contenu : après la modification d'un node, seuls ce node
+    et les nodes suivants dont l'état d'entrée a changé sont rendus à nouveau.
+
+    Les scénarios (voir `split_scenarios`) qui ont des segments à rendre sont répartis sur
+    `workers` processus, puis toutes les vidéos sont assemblées dans l'ordre.
+
+    Parameters
+    ----------
+    animation_dict : dict
+        Le dictionnaire d'animation : positions initiales des joueurs et défenseurs,
+        joueur avec la balle, nom de la scène et séquence d'animation
+    output_dir : Path
+        Le dossier de sortie propre à ce rendu (voir `new_job_dir`)
+    quality : str
+        La qualité de rendu, une clé de RENDER_QUALITIES ("draft" ou "final")
+    nodes : tuple, optional
+        Ne rendre que les nodes de la plage (début, fin), fin exclue (voir `plan_segments`)
+    workers : int
+        Nombre de processus qui rendent les scénarios en parallèle (1 : tout est rendu dans ce processus)
+    stream_dir : Path, optional
+        Dossier où publier chaque segment dès qu'il est rendu, pour lire le début de la vidéo
+        pendant le rendu (voir `render_output.ready_segments`)
+
+    Returns
+    -------
+    Path
+        Le chemin de la vidéo générée, à l'intérieur de `output_dir`
+
+    Raises
+    ------
+    ValueError
+        Si la plage de nodes est invalide ou ne contient aucun node qui produit des images
+
+    Usage
+    -----
+    >>> animation_file = create_manim_animation(animation_dict, new_job_dir(RENDER_JOBS_DIR))
+    >>> _, col_preview, _ = st.columns([1, 8, 1])
+    >>> col_preview.video(str(animation_file), autoplay=True)
+    """
+    # Chaque rendu écrit dans son propre dossier, seuls les caches Tex et Text sont partagés.
+    # La configuration de manim est globale au processus : cette fonction est donc
+    # exécutée dans un processus de rendu dédié (voir render_jobs.py).
+    segment_cache = RenderCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_SIZE)
+    tag = quality_tag(quality)
+
+    with phase("plan"):
+        segments = plan_segments(animation_dict, nodes)
+    if not segments:
+        raise ValueError("Les nodes sélectionnés ne produisent aucune image (uniquement des save_state).")
+    scenarios = split_scenarios(list(enumerate(segments)))
+    if stream_dir is not None:
+        start_stream(stream_dir, len(segments))
+
+    # Seuls les scénarios qui ont des segments absents du cache valent le coût d'un processus
+    with phase("cache_lookup"):
+        to_render = [
+            k for k, scenario in enumerate(scenarios)
+            if any(segment_cache.get(segment_cache_key(segment, tag)) is None for _, segment in scenario)
+        ]
+    futures = {}
+    executor = None
+    if workers > 1 and len(to_render) > 1:
+        # Même contexte que la file de rendu : manim est importé à neuf dans chaque processus
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(to_render)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        futures = {
+            k: executor.submit(render_scenario, animation_dict, scenarios[k], output_dir, quality, stream_dir)
+            for k in to_render
+        }
+    if any(k not in futures for k in to_render):
+        # Les Tex des numéros sont construits une fois par processus de rendu, pas à chaque segment
+        with phase("labels"):
+            warm_player_labels()
+    try:
+        segment_files = []
+        for k, scenario in enumerate(scenarios):
+            if k in futures:
+                scenario_files, scenario_profile = futures[k].result()
+                segment_files.extend(scenario_files)
+                if current_profile() is not None:
+                    current_profile().merge(scenario_profile)
+            else:
+                segment_files.extend(render_segments(animation_dict, scenario, output_dir, quality, stream_dir))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    with phase("concat"):
+        return concat_videos(segment_files, Path(output_dir) / f"Systeme_basketball_{tag}.mp4")
+
+
+def render_to_cache(animation_dict, cache_key, quality=DEFAULT_RENDER_QUALITY, nodes=None, workers=1, stream_dir=None):
+    """
+    Rend une animation (ou seulement la plage de nodes `nodes`) dans un dossier isolé puis
+    la copie dans le cache de rendu.
+
+    C'est la tâche exécutée par les processus de rendu. Les scénarios de l'animation sont
+    eux-mêmes rendus en parallèle sur `workers` processus, et les segments terminés sont
+    publiés dans `stream_dir` (voir `create_manim_animation`).
+
+    Returns
+    -------
+    Path
+        Le chemin de la vidéo dans le cache de rendu.
+    """
+    # Les dossiers des rendus abandonnés ou en erreur sont supprimés au bout de RENDER_JOBS_MAX_AGE
+    cleanup_old_jobs(RENDER_JOBS_DIR, RENDER_JOBS_MAX_AGE)
+    job_dir = new_job_dir(RENDER_JOBS_DIR, tag=quality)
+
+    # Les mesures du rendu sont écrites à côté du cache, sous le nom de la clé de la vidéo
+    with recording(quality=quality_tag(quality), cache_key=cache_key) as profile:
+        video_file = create_manim_animation(animation_dict, job_dir, quality, nodes, workers, stream_dir)
+        with phase("cache_store"):
+            video_file = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE).put(cache_key, video_file)
+    write_metrics(profile, RENDER_METRICS_DIR, cache_key, max_files=RENDER_METRICS_MAX_FILES)
+    # La vidéo est dans le cache, le dossier du rendu n'est plus utile
+    remove_job_dir(job_dir)
+    return video_file
@@ -0,0 +1,260 @@
+"""
+Calcul de l'état de la scène (positions, balle, texte, états sauvegardés) à l'entrée
+de chaque node, sans manim.
+
+Les règles reproduisent celles de `Systeme_basketball` et de `Player` : un node
+d'actions est construit dans l'ordre de ses actions, et la possession de la balle
+est mise à jour au moment de la construction de chaque animation. Les positions
+sont exprimées dans l'espace manim.
+"""
+import copy
+from bisect import bisect_right
+
+from coordinates import Position, clicks_to_manim, convert_coordinates_to_manim
+
+
+NUM_JOUEURS = 5
+NUM_DEFENSEURS = 5
+BALL_COLOR = "#FF862F"  # ORANGE dans manim
+SHOT_BALL_COLOR = "#000000"  # BLACK dans manim : la balle devient noire après un tir
+SHOT_BALL_SCALE = 0.6
+SITUATION_TEXT_DEFAULTS = {"scale": 1.5, "position": [-1, -1, 0], "opacity": 0.5}  # DOWN + LEFT
+RESTORE_WAIT = 2  # Pause avant et après la restauration d'un état, en secondes
+TEXT_TRANSFORM_TIME = 1  # Durée par défaut d'une animation Transform
+INTRO_DURATION = 2  # Create(balle) puis wait(1)
+OUTRO_DURATION = 1  # wait(1) final
+
+
+# ========== Timing ==========
+
+def action_timings(node):
+    """
+    Calcule le début et la fin de chaque action d'un node d'actions, en secondes depuis le début du node.
+
+    Les groupes de `time_arrangement` sont joués avec `LaggedStart(..., lag_ratio=time_between)` :
+    le groupe k commence après que le groupe k-1 a parcouru la fraction `time_between`
+    de sa durée (la durée d'un groupe étant la plus longue de ses actions).
+
+    Returns
+    -------
+    dict
+        {indice de l'action: (début, fin)}, pour les actions jouées par le node.
+    """
+    timings = {}
+    group_start = 0.0
+    for indices in node["time_arrangement"].values():
+        group_duration = max((node["moves"][i][-2] for i in indices), default=0.0)
+        for i in indices:
+            timings[i] = (group_start, group_start + node["moves"][i][-2])
+        group_start += group_duration * node["time_between"]
+    return timings
+
+
+def node_duration(node):
+    """
+    Durée d'un node dans la vidéo, en secondes.
+    """
+    node_type = node["type"]
+    if node_type == "move":
+        return max((end for _, end in action_timings(node).values()), default=0.0)
+    if node_type == "restore_state":
+        return 2 * RESTORE_WAIT + TEXT_TRANSFORM_TIME
+    if node_type == "wait":
+        return node["duration"]
+    if node_type == "write_text":
+        return TEXT_TRANSFORM_TIME
+    return 0.0
+
+
+def animation_duration(animation_dict):
+    """
+    Durée totale de la vidéo d'une animation, introduction et fin comprises, en secondes.
+    """
+    return (
+        INTRO_DURATION
+        + sum(node_duration(node) for node in animation_dict["animation_sequence"])
+        + OUTRO_DURATION
+    )
+
+
+class TimelineIndex:
+    """
+    Index des intervalles de temps des nodes et des actions d'une animation dans la vidéo.
+
+    Les débuts des nodes sont triés : trouver le node joué à un instant est une recherche
+    dichotomique, et l'intervalle d'un node est lu directement.
+
+    Parameters
+    ----------
+    animation_sequence : list
+        La séquence de nodes de l'animation.
+
+    Usage
+    -----
+    >>> index = TimelineIndex(animation_dict["animation_sequence"])
+    >>> start, end = index.node_interval(12)
+    >>> index.node_at(37.5), index.actions_at(37.5)
+    """
+
+    __slots__ = ("starts", "ends", "types", "actions", "duration")
+
+    def __init__(self, animation_sequence):
+        self.starts, self.ends, self.types, self.actions = [], [], [], []
+        t = float(INTRO_DURATION)
+        for node in animation_sequence:
+            duration = node_duration(node)
+            self.starts.append(t)
+            self.ends.append(t + duration)
+            self.types.append(node["type"])
+            # (début, fin, indice) de chaque action jouée, en temps absolu
+            timings = action_timings(node) if node["type"] == "move" else {}
+            self.actions.append(sorted((t + start, t + end, i) for i, (start, end) in timings.items()))
+            t += duration
+        self.duration = t + OUTRO_DURATION
+
+    def __len__(self):
+        return len(self.starts)
+
+    def node_interval(self, index):
+        """
+        (début, fin) du node `index` dans la vidéo, en secondes.
+        """
+        return self.starts[index], self.ends[index]
+
+    def node_at(self, t):
+        """
+        Indice du node joué à l'instant `t`, ou None pendant l'introduction et la fin de la vidéo.
+
+        Un node sans durée (save_state) n'est jamais renvoyé : le node suivant commence au même instant.
+        """
+        k = bisect_right(self.starts, t) - 1
+        if k < 0 or t >= self.ends[k]:
+            return None
+        return k
+
+    def actions_at(self, t):
+        """
+        Indices des actions en cours à l'instant `t`, dans le node joué à cet instant.
+        """
+        k = self.node_at(t)
+        if k is None:
+            return []
+        return [i for start, end, i in self.actions[k] if start <= t < end]
+
+
+# ========== State ==========
+
+def initial_state(animation_dict):
+    """
+    État de la scène au début de l'animation.
+
+    Returns
+    -------
+    dict
+        {
+            "players": positions manim des attaquants,
+            "has_ball": possession de la balle pour chaque attaquant,
+            "ball": {"position", "scale", "color"},
+            "text": texte de situation affiché en bas à gauche,
+            "saved_states": {nom: {"players", "has_ball", "ball"}},
+        }
+    """
+    players = clicks_to_manim(
+        [animation_dict[f"joueur{i+1}_init_pos"] for i in range(NUM_JOUEURS)]
+    ).tolist()
+    holder = animation_dict["player_number_has_ball"]
+    return {
+        "players": players,
+        "has_ball": [i + 1 == holder for i in range(NUM_JOUEURS)],
+        "ball": {"position": list(players[holder - 1]), "scale": 1.0, "color": BALL_COLOR},
+        "text": {"text": "", **SITUATION_TEXT_DEFAULTS},
+        "saved_states": {},
+    }
+
+
+def advance(state, node):
+    """
+    Renvoie l'état de la scène après un node, sans modifier `state`.
+
+    Raises
+    ------
+    KeyError
+        Si un node restore_state fait référence à un état qui n'a pas été sauvegardé.
+    """
+    state = copy.deepcopy(state)
+    node_type = node["type"]
+
+    if node_type == "move":
+        _advance_move_node(state, node)
+    elif node_type == "save_state":
+        state["saved_states"][node["name"]] = {
+            "players": copy.deepcopy(state["players"]),
+            "has_ball": list(state["has_ball"]),
+            "ball": dict(state["ball"]),
+        }
+    elif node_type == "restore_state":
+        try:
+            saved = state["saved_states"][node["name"]]
+        except KeyError:
+            raise KeyError(f"État '{node['name']}' restauré sans avoir été sauvegardé") from None
+        state["players"] = copy.deepcopy(saved["players"])
+        state["has_ball"] = list(saved["has_ball"])
+        state["ball"] = dict(saved["ball"])
+        state["text"] = {"text": node["new_text"], **SITUATION_TEXT_DEFAULTS}
+    elif node_type == "write_text":
+        state["text"] = {
+            "text": node["text"],
+            "scale": node.get("scale", SITUATION_TEXT_DEFAULTS["scale"]),
+            "position": list(node.get("position", SITUATION_TEXT_DEFAULTS["position"])),
+            "opacity": node.get("opacity", SITUATION_TEXT_DEFAULTS["opacity"]),
+        }
+    return state
+
+
+def _advance_move_node(state, node):
+    start_positions = copy.deepcopy(state["players"])
+    timings = action_timings(node)
+    # (fin de l'animation, ordre, position finale) pour chaque animation qui déplace la balle
+    ball_moves = []
+
+    for idx, value in enumerate(node["moves"]):
+        player_idx = int(value[0]) - 1
+        method_name = value[-1]
+        args = value[1:-2]
+        end = timings.get(idx, (0.0, 0.0))[1]
+
+        if method_name == "pass_ball":
+            target_idx = args[0] - 1
+            # La passe va vers la position du receveur au début du node
+            ball_moves.append((end, idx, list(start_positions[target_idx])))
+            state["has_ball"][player_idx] = False
+            state["has_ball"][target_idx] = True
+        elif method_name == "move":
+            final_position = list(convert_coordinates_to_manim(args[-1]))
+            if state["has_ball"][player_idx]:
+                ball_moves.append((end, idx, final_position))
+            state["players"][player_idx] = final_position
+        elif method_name == "shoot_ball":
+            ball_moves.append((end, idx, list(Position.net_position)))
+            state["has_ball"][player_idx] = False
+            state["ball"]["scale"] *= SHOT_BALL_SCALE
+            state["ball"]["color"] = SHOT_BALL_COLOR
+
+    if ball_moves:
+        # La balle finit là où l'emmène la dernière animation qui la déplace
+        state["ball"]["position"] = max(ball_moves, key=lambda move: move[:2])[2]
+
+
+def sequence_states(animation_dict):
+    """
+    États de la scène à l'entrée de chaque node, suivis de l'état final.
+
+    Returns
+    -------
+    list
+        Liste de `len(animation_sequence) + 1` états.
+    """
+    states = [initial_state(animation_dict)]
+    for node in animation_dict["animation_sequence"]:
+        states.append(advance(states[-1], node))
+    return states
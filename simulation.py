@@ -0,0 +1,346 @@
+"""
+Simulation d'une animation sans manim : où est chaque joueur, qui a la balle, quel texte
+est affiché, à n'importe quel instant de la vidéo.
+
+Les règles suivent celles de `Systeme_basketball` : les animations d'un node sont
+construites dans l'ordre de ses actions, les groupes de `time_arrangement` sont
+décalés comme avec `LaggedStart`, les déplacements suivent une trajectoire lisse
+(`paths.SmoothPath`) et, quand plusieurs animations déplacent la même entité en même
+temps, la dernière dans l'ordre de lecture l'emporte.
+
+Chaque entité a une timeline par morceaux (une position fixe ou une animation en cours),
+triée par instant de début : une requête à l'instant t est une recherche dichotomique,
+en O(log n) pour n morceaux, suivie de l'évaluation d'une seule trajectoire.
+
+Usage
+-----
+>>> simulation = Simulation(animation_dict)
+>>> state = simulation.state_at(7.3)
+>>> state["ball_holder"], state["players"][0]
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+from coordinates import Position, clicks_to_manim, optional_clicks_to_manim
+from paths import SmoothPath
+from scene_state import (
+    NUM_DEFENSEURS,
+    RESTORE_WAIT,
+    SHOT_BALL_COLOR,
+    TimelineIndex,
+    action_timings,
+    sequence_states,
+)
+
+
+BALL_RESTORE_TIME = 0.1  # Durée de Restore(balle) dans restore_state
+BALL_CREATE_TIME = 1  # Durée de Create(balle) au début de la scène
+
+
+# ========== Timelines ==========
+
+class StepTimeline:
+    """
+    Valeur constante par morceaux : la valeur fixée à l'instant t vaut jusqu'au changement suivant.
+    """
+
+    __slots__ = ("times", "values")
+
+    def __init__(self, value, t=0.0):
+        self.times = [t]
+        self.values = [value]
+
+    def set(self, t, value):
+        """
+        Change la valeur à l'instant `t`, qui ne peut pas précéder le dernier changement.
+        """
+        if value == self.values[-1]:
+            return
+        if t <= self.times[-1]:
+            # Plusieurs changements au même instant : le dernier l'emporte
+            self.values[-1] = value
+        else:
+            self.times.append(t)
+            self.values.append(value)
+
+    def at(self, t):
+        return self.values[max(0, bisect_right(self.times, t) - 1)]
+
+    def __iter__(self):
+        return zip(self.times, self.values)
+
+
+def piece_positions(piece, times):
+    """
+    Positions [x, y] d'un morceau de timeline aux instants `times`.
+
+    Un morceau est soit (None, None, position fixe), soit (début, fin, trajectoire) pour une
+    animation suivie à vitesse constante entre début et fin.
+    """
+    start, end, path = piece
+    times = np.asarray(times, dtype=float)
+    if start is None:
+        return np.broadcast_to(path, (len(times), 2))
+    if end <= start:
+        alphas = np.ones(len(times))
+    else:
+        alphas = np.clip((times - start) / (end - start), 0.0, 1.0)
+    return path.points_at(alphas)
+
+
+class EntityTimeline:
+    """
+    Trajectoire d'une entité (un attaquant ou la balle) sur toute la vidéo.
+
+    `times[k]` est l'instant à partir duquel le morceau `pieces[k]` s'applique (voir `piece_positions`).
+    """
+
+    __slots__ = ("times", "pieces")
+
+    def __init__(self, position):
+        self.times = [0.0]
+        self.pieces = [(None, None, np.asarray(position, dtype=float)[:2])]
+
+    def _add(self, t, piece):
+        last = self.pieces[-1]
+        if piece[0] is not None and piece[0] == last[0] and piece[2] is last[2]:
+            return  # La même animation continue
+        if t <= self.times[-1]:
+            self.pieces[-1] = piece
+        else:
+            self.times.append(t)
+            self.pieces.append(piece)
+
+    def hold(self, t, position):
+        """
+        Place l'entité en `position` à l'instant `t`, instantanément.
+        """
+        self._add(t, (None, None, np.asarray(position, dtype=float)[:2]))
+
+    def follow(self, t, start, end, path):
+        """
+        À partir de l'instant `t`, l'entité suit `path`, parcourue entre `start` et `end`.
+        """
+        self._add(t, (start, end, path))
+
+    def at(self, t):
+        """
+        Position [x, y] à l'instant `t`.
+        """
+        k = max(0, bisect_right(self.times, t) - 1)
+        return piece_positions(self.pieces[k], [t])[0]
+
+    def sample(self, times):
+        """
+        Positions aux instants `times` : un tableau (N, 2), chaque morceau étant évalué en un seul appel.
+        """
+        times = np.asarray(times, dtype=float)
+        indices = np.maximum(np.searchsorted(self.times, times, side="right") - 1, 0)
+        positions = np.empty((len(times), 2))
+        for k in np.unique(indices):
+            mask = indices == k
+            positions[mask] = piece_positions(self.pieces[k], times[mask])
+        return positions
+
+    def spans(self):
+        """
+        Parcourt les morceaux sous la forme (début, fin ou None pour le dernier, morceau).
+        """
+        ends = self.times[1:] + [None]
+        return zip(self.times, ends, self.pieces)
+
+
+def _follow_animations(timeline, animations):
+    """
+    Ajoute à la timeline d'une entité les animations d'un node qui la déplacent.
+
+    Entre deux débuts ou fins d'animation, l'entité suit la dernière animation en cours dans
+    l'ordre de lecture ; quand aucune n'est en cours, elle reste là où l'a laissée celle qui
+    a fini le plus tard.
+
+    Parameters
+    ----------
+    animations : list
+        [(début, fin, trajectoire)] en temps absolu, dans l'ordre de lecture.
+    """
+    bounds = sorted({t for start, end, _ in animations for t in (start, end)})
+    for t, t_next in zip(bounds, bounds[1:] + [None]):
+        active = [anim for anim in animations if t_next is not None and anim[0] <= t and anim[1] >= t_next]
+        if active:
+            timeline.follow(t, *active[-1])
+            continue
+        ended = [(anim[1], order) for order, anim in enumerate(animations) if anim[1] <= t]
+        if ended:
+            start, end, path = animations[max(ended)[1]]
+            timeline.hold(t, path.points_at([1.0])[0])
+
+
+def _node_animations(node, state):
+    """
+    Animations d'un node d'actions, dans l'ordre de lecture.
+
+    Returns
+    -------
+    tuple
+        ([(entité, début, fin, trajectoire)], [(instant, ordre, porteur)]) : les animations, où
+        l'entité est l'indice d'un attaquant ou "ball", et les changements de porteur de la balle
+        (numéro du joueur, ou None pendant une passe ou après un tir), en temps relatif au node.
+    """
+    has_ball = list(state["has_ball"])
+    start_positions = state["players"]
+    timings = action_timings(node)
+    built = []  # Animations de chaque action, construites dans l'ordre des actions
+    holders = []
+    for idx, value in enumerate(node["moves"]):
+        player_idx = int(value[0]) - 1
+        method_name = value[-1]
+        args = value[1:-2]
+        start = start_positions[player_idx][:2]
+        action_start, action_end = timings.get(idx, (0.0, 0.0))
+
+        if method_name == "pass_ball":
+            target_idx = args[0] - 1
+            built.append([("ball", SmoothPath([start, start_positions[target_idx][:2]]))])
+            has_ball[player_idx] = False
+            has_ball[target_idx] = True
+            holders.append((action_start, idx, None))
+            holders.append((action_end, idx, target_idx + 1))
+        elif method_name == "move":
+            path = SmoothPath([start, *clicks_to_manim(args)[:, :2]])
+            if has_ball[player_idx]:
+                built.append([("ball", path), (player_idx, path)])
+            else:
+                built.append([(player_idx, path)])
+        elif method_name == "shoot_ball":
+            built.append([("ball", SmoothPath([start, Position.net_position[:2]]))])
+            has_ball[player_idx] = False
+            holders.append((action_start, idx, None))
+        else:
+            built.append([])
+
+    animations = []
+    for indices in node["time_arrangement"].values():
+        for i in indices:
+            start, end = timings[i]
+            animations.extend((entity, start, end, path) for entity, path in built[i])
+    return animations, sorted(holders, key=lambda change: change[:2])
+
+
+# ========== Simulation ==========
+
+class Simulation:
+    """
+    Timelines de toutes les entités d'une animation, calculées sans manim.
+
+    Les positions sont dans l'espace manim ; `index` donne l'intervalle de temps de chaque node
+    (voir `scene_state.TimelineIndex`).
+
+    Parameters
+    ----------
+    animation_dict : dict
+        Le dictionnaire d'animation.
+
+    Raises
+    ------
+    KeyError
+        Si un node restore_state fait référence à un état qui n'a pas été sauvegardé.
+    """
+
+    __slots__ = ("title", "duration", "index", "players", "defenders", "ball", "ball_holder", "ball_style", "texts")
+
+    def __init__(self, animation_dict):
+        states = sequence_states(animation_dict)
+        initial = states[0]
+        self.title = animation_dict["scene_name"]
+        self.players = [EntityTimeline(position) for position in initial["players"]]
+        self.defenders = [
+            None if position is None else position[:2]
+            for position in optional_clicks_to_manim(
+                [animation_dict[f"defenseur{i+1}_init_pos"] for i in range(NUM_DEFENSEURS)]
+            )
+        ]
+        self.ball = EntityTimeline(initial["ball"]["position"])
+        self.ball_holder = StepTimeline(self._holder(initial))
+        self.ball_style = StepTimeline((initial["ball"]["scale"], initial["ball"]["color"]))
+        self.texts = StepTimeline(initial["text"]["text"])
+        self.index = TimelineIndex(animation_dict["animation_sequence"])
+
+        for index, node in enumerate(animation_dict["animation_sequence"]):
+            state, next_state = states[index], states[index + 1]
+            t = self.index.starts[index]
+
+            if node["type"] == "move":
+                self._add_move_node(node, state, next_state, t)
+            elif node["type"] == "restore_state":
+                t_restore = t + RESTORE_WAIT
+                # Les joueurs sont replacés instantanément, la balle revient en BALL_RESTORE_TIME
+                for timeline, position in zip(self.players, next_state["players"]):
+                    timeline.hold(t_restore, position)
+                ball_path = SmoothPath([self.ball.at(t_restore), next_state["ball"]["position"][:2]])
+                self.ball.follow(t_restore, t_restore, t_restore + BALL_RESTORE_TIME, ball_path)
+                self.ball.hold(t_restore + BALL_RESTORE_TIME, next_state["ball"]["position"])
+                self.ball_holder.set(t_restore, self._holder(next_state))
+                self.ball_style.set(t_restore, (next_state["ball"]["scale"], next_state["ball"]["color"]))
+                self.texts.set(t_restore, next_state["text"]["text"])
+            elif node["type"] == "write_text":
+                self.texts.set(t, next_state["text"]["text"])
+
+        self.duration = self.index.duration
+
+    @staticmethod
+    def _holder(state):
+        return next((i + 1 for i, has_ball in enumerate(state["has_ball"]) if has_ball), None)
+
+    def _add_move_node(self, node, state, next_state, t0):
+        animations, holders = _node_animations(node, state)
+        # Le tir réduit et noircit la balle dès la construction des animations
+        if next_state["ball"]["scale"] != state["ball"]["scale"]:
+            self.ball_style.set(t0, (next_state["ball"]["scale"], SHOT_BALL_COLOR))
+
+        by_entity = {}
+        for entity, start, end, path in animations:
+            by_entity.setdefault(entity, []).append((t0 + start, t0 + end, path))
+        for entity, entity_animations in by_entity.items():
+            timeline = self.ball if entity == "ball" else self.players[entity]
+            _follow_animations(timeline, entity_animations)
+        for t, _, holder in holders:
+            self.ball_holder.set(t0 + t, holder)
+
+    def node_at(self, t):
+        """
+        Indice du node joué à l'instant `t`, ou None pendant l'introduction et la fin de la vidéo.
+        """
+        return self.index.node_at(t)
+
+    def state_at(self, t):
+        """
+        État de la scène à l'instant `t`.
+
+        Returns
+        -------
+        dict
+            {
+                "time": t,
+                "node": indice du node en cours, ou None,
+                "players": position [x, y] de chaque attaquant,
+                "defenders": position [x, y] de chaque défenseur, ou None,
+                "ball": position [x, y] de la balle,
+                "ball_holder": numéro du joueur qui a la balle, ou None,
+                "ball_scale", "ball_color": style de la balle,
+                "text": texte de situation affiché,
+            }
+        """
+        scale, color = self.ball_style.at(t)
+        return {
+            "time": t,
+            "node": self.node_at(t),
+            "players": [timeline.at(t).tolist() for timeline in self.players],
+            "defenders": [None if position is None else position.tolist() for position in self.defenders],
+            "ball": self.ball.at(t).tolist(),
+            "ball_holder": self.ball_holder.at(t),
+            "ball_scale": scale,
+            "ball_color": color,
+            "text": self.texts.at(t),
+        }
+
@@ -0,0 +1,294 @@
+"""
+Validation d'une animation avant son rendu, sans manim.
+
+`validate_animation` vérifie la structure du dictionnaire d'animation puis simule la
+séquence (possession de la balle, états sauvegardés, arrangement temporel) comme le
+ferait `Systeme_basketball`. Tous les problèmes sont signalés en une fois, avec le
+numéro du node et de l'action concernés, au lieu d'une erreur au milieu du rendu
+(par exemple l'`assert self.has_ball` de `Player.pass_ball`).
+
+Usage
+-----
+>>> issues = validate_animation(animation_dict)
+>>> blocking = errors(issues)
+"""
+from numbers import Real
+
+import numpy as np
+
+from coordinates import clicks_to_unit
+from play_model import ACTION_KINDS, NODE_TYPES
+from scene_state import NUM_DEFENSEURS, NUM_JOUEURS, advance, initial_state
+
+
+ERROR = "error"  # Le rendu échouerait ou donnerait une vidéo incohérente
+WARNING = "warning"  # Le rendu fonctionne mais le résultat est probablement involontaire
+
+
+class ValidationIssue:
+    """
+    Un problème trouvé dans une animation.
+
+    `node_index` et `action_index` commencent à 0 et valent None quand le problème
+    ne concerne pas un node ou une action en particulier.
+    """
+
+    __slots__ = ("severity", "message", "node_index", "action_index")
+
+    def __init__(self, severity, message, node_index=None, action_index=None):
+        self.severity = severity
+        self.message = message
+        self.node_index = node_index
+        self.action_index = action_index
+
+    def __str__(self):
+        # Même numérotation que l'interface : les nodes à partir de 1, les actions à partir de 0
+        where = []
+        if self.node_index is not None:
+            where.append(f"Node {self.node_index + 1}")
+        if self.action_index is not None:
+            where.append(f"action {self.action_index}")
+        return f"{', '.join(where)} : {self.message}" if where else self.message
+
+    def __repr__(self):
+        return f"ValidationIssue({self.severity!r}, {str(self)!r})"
+
+
+def _is_number(value):
+    return isinstance(value, Real) and not isinstance(value, bool) and np.isfinite(value)
+
+
+def _is_player_number(value, allow_text=False):
+    """
+    Numéro de joueur entier entre 1 et NUM_JOUEURS. Avec `allow_text`, un texte de chiffres
+    ("2") est aussi accepté : c'est la forme du joueur dans les actions d'un node.
+    """
+    if allow_text and isinstance(value, str) and value.isdecimal():
+        value = int(value)
+    return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= NUM_JOUEURS
+
+
+def _check_positions(positions, label, report, node_index=None, action_index=None):
+    """
+    Vérifie la forme des positions et qu'elles sont sur le terrain. Renvoie False si elles sont inutilisables.
+    """
+    try:
+        points = clicks_to_unit(positions)
+    except ValueError as e:
+        report(ERROR, f"{label} : {e}", node_index, action_index)
+        return False
+    if not np.isfinite(points).all():
+        report(ERROR, f"{label} : position non finie", node_index, action_index)
+        return False
+    if ((points < 0) | (points > 1)).any():
+        report(WARNING, f"{label} : position en dehors du terrain", node_index, action_index)
+    return True
+
+
+def _check_header(animation_dict, report):
+    """
+    Vérifie les clés générales et les positions initiales. Renvoie False si la séquence ne peut pas être simulée.
+    """
+    ok = True
+    for i in range(NUM_JOUEURS):
+        position = animation_dict.get(f"joueur{i+1}_init_pos")
+        if position is None:
+            report(ERROR, f"Le joueur {i+1} n'est pas positionné")
+            ok = False
+        elif not _check_positions([position], f"Position initiale du joueur {i+1}", report):
+            ok = False
+    for i in range(NUM_DEFENSEURS):
+        position = animation_dict.get(f"defenseur{i+1}_init_pos")
+        if position is not None:
+            _check_positions([position], f"Position initiale du défenseur {i+1}", report)
+
+    if not _is_player_number(animation_dict.get("player_number_has_ball")):
+        report(ERROR, f"Le joueur avec la balle doit être un numéro de 1 à {NUM_JOUEURS}")
+        ok = False
+    if not isinstance(animation_dict.get("scene_name"), str):
+        report(ERROR, "Le nom de la scène doit être un texte")
+
+    sequence = animation_dict.get("animation_sequence")
+    if not isinstance(sequence, list):
+        report(ERROR, "La séquence d'animation doit être une liste de nodes")
+        return False
+    if not sequence:
+        report(ERROR, "La séquence d'animation ne contient aucun node")
+    return ok
+
+
+def _check_move_node(node, index, has_ball, report):
+    """
+    Vérifie un node d'actions et simule la possession de la balle dans l'ordre de construction des animations.
+
+    Returns
+    -------
+    bool
+        True si le node est assez bien formé pour faire avancer l'état de la scène.
+    """
+    moves = node.get("moves")
+    if not isinstance(moves, list) or not moves:
+        report(ERROR, "Le node ne contient aucune action", index)
+        return False
+
+    ok = True
+    players_seen = {}
+    has_ball = list(has_ball)
+    for action_index, value in enumerate(moves):
+        if not isinstance(value, list) or len(value) < 3 or value[-1] not in ACTION_KINDS:
+            report(ERROR, f"Action mal formée : {value!r}", index, action_index)
+            ok = False
+            continue
+        if not _is_player_number(value[0], allow_text=True):
+            report(ERROR, f"Numéro de joueur invalide : {value[0]!r}", index, action_index)
+            ok = False
+            continue
+
+        player = int(value[0])
+        kind, run_time, args = value[-1], value[-2], value[1:-2]
+        if player in players_seen:
+            report(ERROR, f"Le joueur {player} est déjà utilisé par l'action {players_seen[player]} du même node", index, action_index)
+        players_seen.setdefault(player, action_index)
+        if not _is_number(run_time) or run_time <= 0:
+            report(ERROR, f"Durée invalide : {run_time!r} (un nombre positif est attendu)", index, action_index)
+            ok = False
+
+        if kind == "move":
+            if not args:
+                report(ERROR, "Le déplacement ne contient aucune position", index, action_index)
+                ok = False
+            elif not _check_positions(args, "Déplacement", report, index, action_index):
+                ok = False
+        elif kind == "pass_ball":
+            if len(args) != 1 or not isinstance(args[0], int) or not _is_player_number(args[0]):
+                report(ERROR, f"Receveur de la passe invalide : {args!r}", index, action_index)
+                ok = False
+                continue
+            target = int(args[0])
+            if target == player:
+                report(ERROR, f"Le joueur {player} se fait une passe à lui-même", index, action_index)
+            if not has_ball[player - 1]:
+                report(ERROR, f"Le joueur {player} passe la balle sans l'avoir", index, action_index)
+            has_ball[player - 1] = False
+            has_ball[target - 1] = True
+        elif kind == "shoot_ball":
+            if not has_ball[player - 1]:
+                report(ERROR, f"Le joueur {player} tire sans avoir la balle", index, action_index)
+            has_ball[player - 1] = False
+
+    time_between = node.get("time_between")
+    if not _is_number(time_between) or time_between < 0:
+        report(ERROR, f"Temps entre les groupes invalide : {time_between!r}", index)
+        ok = False
+
+    arrangement = node.get("time_arrangement")
+    if not isinstance(arrangement, dict) or not arrangement:
+        report(ERROR, "L'arrangement temporel est vide", index)
+        return False
+    assigned = []
+    for group in arrangement.values():
+        if not isinstance(group, list) or not group:
+            report(ERROR, f"Groupe d'actions vide ou mal formé : {group!r}", index)
+            ok = False
+            continue
+        assigned.extend(group)
+    for action_index in sorted({i for i in assigned if assigned.count(i) > 1}, key=str):
+        report(ERROR, "L'action appartient à plusieurs groupes", index, action_index)
+        ok = False
+    unknown = [i for i in assigned if not isinstance(i, int) or not 0 <= i < len(moves)]
+    if unknown:
+        report(ERROR, f"Le groupe fait référence à des actions inexistantes : {unknown}", index)
+        ok = False
+    for action_index in range(len(moves)):
+        if action_index not in assigned:
+            report(ERROR, "L'action n'appartient à aucun groupe : elle ne serait pas jouée", index, action_index)
+    return ok
+
+
+def _check_node(node, index, state, report):
+    """
+    Vérifie un node. Renvoie True si l'état de la scène peut être avancé avec ce node.
+    """
+    if not isinstance(node, dict) or node.get("type") not in NODE_TYPES:
+        report(ERROR, f"Type de node inconnu : {node.get('type') if isinstance(node, dict) else node!r}", index)
+        return False
+
+    node_type = node["type"]
+    if node_type == "move":
+        return _check_move_node(node, index, state["has_ball"], report)
+    if node_type == "save_state":
+        if not isinstance(node.get("name"), str) or not node["name"]:
+            report(ERROR, "L'état sauvegardé n'a pas de nom", index)
+            return False
+        if node["name"] in state["saved_states"]:
+            report(WARNING, f"L'état '{node['name']}' est déjà sauvegardé : il sera remplacé", index)
+    elif node_type == "restore_state":
+        if not isinstance(node.get("name"), str) or node["name"] not in state["saved_states"]:
+            report(ERROR, f"L'état '{node.get('name')}' est restauré sans avoir été sauvegardé avant", index)
+            return False
+        if not isinstance(node.get("new_text"), str):
+            report(ERROR, "Le nouveau texte doit être un texte", index)
+            return False
+    elif node_type == "wait":
+        if not _is_number(node.get("duration")) or node["duration"] <= 0:
+            report(ERROR, f"Durée de pause invalide : {node.get('duration')!r}", index)
+            return False
+    elif node_type == "write_text":
+        if not isinstance(node.get("text"), str):
+            report(ERROR, "Le texte à afficher doit être un texte", index)
+            return False
+        if "scale" in node and (not _is_number(node["scale"]) or node["scale"] <= 0):
+            report(ERROR, f"Échelle du texte invalide : {node['scale']!r}", index)
+        if "opacity" in node and (not _is_number(node["opacity"]) or not 0 <= node["opacity"] <= 1):
+            report(ERROR, f"Opacité du texte invalide : {node['opacity']!r} (entre 0 et 1)", index)
+        if "position" in node and (
+            not isinstance(node["position"], list) or len(node["position"]) != 3 or not all(map(_is_number, node["position"]))
+        ):
+            report(ERROR, f"Position du texte invalide : {node['position']!r} ([x, y, z] attendu)", index)
+    return True
+
+
+def validate_animation(animation_dict):
+    """
+    Valide une animation complète, sans la rendre.
+
+    Parameters
+    ----------
+    animation_dict : dict
+        Le dictionnaire d'animation (format des fichiers exportés).
+
+    Returns
+    -------
+    list
+        Les `ValidationIssue` trouvés, dans l'ordre de la séquence. Une liste vide signifie
+        que l'animation peut être rendue.
+    """
+    issues = []
+
+    def report(severity, message, node_index=None, action_index=None):
+        issues.append(ValidationIssue(severity, message, node_index, action_index))
+
+    if not isinstance(animation_dict, dict):
+        report(ERROR, "L'animation doit être un dictionnaire")
+        return issues
+    if not _check_header(animation_dict, report):
+        # Sans positions ni joueur avec la balle valides, on vérifie quand même chaque node isolément
+        state = {"has_ball": [True] * NUM_JOUEURS, "saved_states": {}}
+        for index, node in enumerate(animation_dict.get("animation_sequence") or []):
+            _check_node(node, index, state, report)
+            if isinstance(node, dict) and node.get("type") == "save_state":
+                state["saved_states"][node.get("name")] = None
+        return issues
+
+    state = initial_state(animation_dict)
+    for index, node in enumerate(animation_dict["animation_sequence"]):
+        if _check_node(node, index, state, report):
+            state = advance(state, node)
+    return issues
+
+
+def errors(issues):
+    """
+    Les problèmes bloquants parmi `issues`.
+    """
+    return [issue for issue in issues if issue.severity == ERROR]